@@ -50,7 +50,7 @@ class MainAlign:
     """
     
     def __init__(self, input_dir="NPU-Everyday-Sample", output_dir="NPU-Everyday-Sample_Aligned", 
-                 reference_index=0, method="auto"):
+                 reference_index=0, method="auto", reduced_decode=False):
         """
         初始化主要对齐器
         
@@ -62,11 +62,13 @@ class MainAlign:
                         - "superpoint": 深度学习LoFTR方法
                         - "enhanced": 增强传统SIFT+模板匹配方法
                         - "auto": 自动选择最佳方法
+            reduced_decode (bool): 深度学习方法是否在JPEG解码时直接降采样（输出分辨率随之降低）
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.reference_index = reference_index
         self.method = method
+        self.reduced_decode = reduced_decode
         
         # 创建输出目录
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -132,7 +134,8 @@ class MainAlign:
             self.aligner = DeepLearningAlign(
                 input_dir=str(self.input_dir),
                 output_dir=str(self.output_dir),
-                reference_index=self.reference_index
+                reference_index=self.reference_index,
+                reduced_decode=self.reduced_decode
             )
             # 收集GPU信息
             self._collect_hardware_info()
@@ -182,7 +185,8 @@ class MainAlign:
             temp_aligner = DeepLearningAlign(
                 input_dir=str(self.input_dir),
                 output_dir=str(temp_output),
-                reference_index=self.reference_index
+                reference_index=self.reference_index,
+                reduced_decode=self.reduced_decode
             )
         else:
             temp_aligner = EnhancedAlign(
@@ -540,6 +544,9 @@ def main():
                        default='auto',
                        help='对齐方法选择 (默认: auto - 自动选择最佳方法)')
     
+    parser.add_argument('--reduced-decode', action='store_true',
+                       help='深度学习方法在JPEG解码时直接降采样，加快处理但降低输出分辨率')
+    
     args = parser.parse_args()
     
     # 打印启动信息
@@ -557,7 +564,8 @@ def main():
             input_dir=args.input,
             output_dir=args.output,
             reference_index=args.reference,
-            method=args.method
+            method=args.method,
+            reduced_decode=args.reduced_decode
         )
         
         # 执行对齐处理
@@ -17,12 +17,12 @@ TickTock-SuperPoint-Align Library
 
 import cv2
 import numpy as np
+from PIL import Image
 from pathlib import Path
 import logging
 import time
 import warnings
-import requests
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 # 深度学习导入
@@ -30,6 +30,12 @@ import torch
 import torch.nn.functional as F
 TORCH_AVAILABLE = True
 
+# 输入尺寸固定(640x640)，让cuDNN为每个卷积自动选择最快算法
+torch.backends.cudnn.benchmark = True
+# Ampere及以上GPU允许矩阵乘法使用TF32
+if hasattr(torch, 'set_float32_matmul_precision'):
+    torch.set_float32_matmul_precision('high')
+
 import os
 os.environ["CUDA_VISIBLE_DEVICES"] = "3"  # 指定使用的GPU
 
@@ -49,12 +55,18 @@ except ImportError:
     SIFT_AVAILABLE = False
     LOFTR_AVAILABLE = False
 
+from image_files import walk_images, IMAGE_EXTENSIONS
+
 try:
     from scipy.ndimage import maximum_filter
     SCIPY_AVAILABLE = True
 except ImportError:
     SCIPY_AVAILABLE = False
 
+# 对齐结果JPEG编码参数（关闭Huffman表二次优化）
+JPEG_WRITE_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -67,7 +79,7 @@ class DeepLearningAlign:
     当深度学习方法不可用时自动回退到传统SIFT方法。
     """
     
-    def __init__(self, input_dir="Lib", output_dir="DL-Align", reference_index=0):
+    def __init__(self, input_dir="Lib", output_dir="DL-Align", reference_index=0, reduced_decode=False):
         """
         初始化SuperPoint对齐器
         
@@ -75,10 +87,17 @@ class DeepLearningAlign:
             input_dir (str): 输入图像文件夹路径
             output_dir (str): 输出对齐图像文件夹路径
             reference_index (int): 参考图像索引
+            reduced_decode (bool): 是否在JPEG解码时直接降采样（输出分辨率随之降低）
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.reference_index = reference_index
+        self.reduced_decode = reduced_decode
+        self.read_flag = cv2.IMREAD_COLOR
+        
+        # LoFTR参考图像骨干网络特征缓存
+        self.ref_feats = None
+        self._preprocess_compiled = False
         
         # 创建输出目录
         self.output_dir.mkdir(exist_ok=True)
@@ -128,6 +147,7 @@ class DeepLearningAlign:
                     logger.info("LoFTR模型初始化成功")
                     self.model_available = True
                     self.use_loftr = True
+                    self.compile_preprocess()
                     return
                 else:
                     logger.warning("未找到LoFTR支持，回退到其他方法")
@@ -150,23 +170,9 @@ class DeepLearningAlign:
             # 创建目录
             Path(local_path).parent.mkdir(parents=True, exist_ok=True)
             
-            # 下载文件
-            response = requests.get(model_url, stream=True)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            
-            with open(local_path, 'wb') as f, tqdm(
-                desc="下载LoFTR模型",
-                total=total_size,
-                unit='B',
-                unit_scale=True,
-                unit_divisor=1024,
-            ) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        pbar.update(len(chunk))
+            # 下载文件（torch.hub内部使用大缓冲区读取并自带进度条）
+            from torch.hub import download_url_to_file
+            download_url_to_file(model_url, str(local_path), progress=True)
             
             logger.info(f"LoFTR模型下载完成: {local_path}")
             return True
@@ -206,16 +212,9 @@ class DeepLearningAlign:
         self.model_available = True
     
     def get_image_files(self):
-        """获取输入目录中的所有图像文件"""
-        image_files = []
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        
-        for ext in image_extensions:
-            image_files.extend(list(self.input_dir.rglob(f"*{ext}")))
-            image_files.extend(list(self.input_dir.rglob(f"*{ext.upper()}")))
-        
-        image_files = list(set([str(f) for f in image_files]))
-        image_files.sort()
+        """获取输入目录中的所有图像文件（单次os.scandir遍历）"""
+        # scandir每个文件只产出一次，无需set去重
+        image_files = sorted(walk_images(self.input_dir, IMAGE_EXTENSIONS))
         return image_files
     
 
@@ -254,10 +253,11 @@ class DeepLearningAlign:
                         scale = np.sqrt(laf[0, 0]**2 + laf[0, 1]**2)
                         keypoints.append(cv2.KeyPoint(x=float(x), y=float(y), size=float(scale)))
                     
-                    desc_np = descriptors[0].cpu().numpy().T  # [N, 128]
+                    # 描述子保留在设备上 [N, 128]，供GPU暴力匹配使用
+                    desc_tensor = descriptors[0]
                     
                     logger.info(f"Kornia SIFT特征提取: {len(keypoints)}个关键点")
-                    return keypoints, desc_np
+                    return keypoints, desc_tensor
                 else:
                     logger.warning("Kornia SIFT未检测到特征点")
                     return self.extract_features_sift(img)
@@ -268,6 +268,27 @@ class DeepLearningAlign:
     
 
     
+    def select_read_flag(self, img_path):
+        """
+        根据原图尺寸选择解码降采样标志，由libjpeg在解码阶段完成1/2或1/4缩小
+        
+        尺寸只从文件头读取（PIL惰性打开，不解码像素），图像本身只解码一次
+        """
+        if not self.reduced_decode:
+            return cv2.IMREAD_COLOR
+        
+        try:
+            with Image.open(img_path) as img:
+                longest_side = max(img.size)
+        except OSError:
+            return cv2.IMREAD_COLOR
+        
+        if longest_side < 1280:
+            return cv2.IMREAD_COLOR
+        if longest_side < 2560:
+            return cv2.IMREAD_REDUCED_COLOR_2
+        return cv2.IMREAD_REDUCED_COLOR_4
+    
     def extract_features_sift(self, img):
         """使用传统SIFT提取特征"""
         if len(img.shape) == 3:
@@ -302,20 +323,109 @@ class DeepLearningAlign:
         
         # 调整大小
         resized = cv2.resize(gray, (new_w, new_h))
-        
-        # 创建填充的正方形图像
-        padded = np.zeros((target_size, target_size), dtype=np.uint8)
         start_x = (target_size - new_w) // 2
         start_y = (target_size - new_h) // 2
-        padded[start_y:start_y+new_h, start_x:start_x+new_w] = resized
         
-        # 转换为tensor
-        tensor_img = torch.from_numpy(padded).float().unsqueeze(0).unsqueeze(0).to(self.device) / 255.0
+        # 以uint8上传，归一化与居中填充在设备上完成
+        resized_tensor = torch.from_numpy(resized).to(self.device)
+        tensor_img = self._preprocess_gpu(resized_tensor, start_x, start_y, target_size)
+        if self._preprocess_compiled:
+            # CUDA Graph会在下次调用时复用输出内存，参考图像tensor需长期持有
+            tensor_img = tensor_img.clone()
         
         return tensor_img, scale, (start_x, start_y, new_w, new_h)
+    
+    def _preprocess_gpu(self, resized_tensor, start_x, start_y, target_size):
+        """uint8灰度图 -> 归一化并居中填充的 [1, 1, target_size, target_size] float tensor"""
+        new_h, new_w = resized_tensor.shape
+        tensor_img = resized_tensor.float().div(255.0)
+        tensor_img = F.pad(tensor_img, (start_x, target_size - new_w - start_x,
+                                        start_y, target_size - new_h - start_y))
+        return tensor_img.unsqueeze(0).unsqueeze(0)
+    
+    def compile_preprocess(self):
+        """
+        用torch.compile特化LoFTR预处理
+        
+        一次运行内target_size与图像尺寸不变，dynamic=False让常量折叠，
+        reduce-overhead模式通过CUDA Graph捕获整段kernel启动序列。
+        需要PyTorch 2.x与CUDA，否则保持eager实现。
+        """
+        if not hasattr(torch, 'compile') or torch.device(self.device).type != 'cuda':
+            return
+        try:
+            self._preprocess_gpu = torch.compile(self._preprocess_gpu, mode='reduce-overhead', dynamic=False)
+            self._preprocess_compiled = True
+            logger.info("LoFTR预处理已启用torch.compile")
+        except Exception as e:
+            logger.warning(f"torch.compile不可用，使用eager预处理: {e}")
+    
+    def warmup_preprocess(self, img, iterations=3):
+        """在主循环前触发编译与CUDA Graph捕获"""
+        if not self._preprocess_compiled:
+            return
+        for _ in range(iterations):
+            self.preprocess_for_loftr(img)
 
+    def cache_loftr_reference(self, ref_tensor):
+        """
+        预先计算参考图像的骨干网络特征
+        
+        LoFTR的CNN骨干网络和位置编码只依赖单张图像，参考图像的这部分结果
+        可在所有图像对之间复用；粗匹配Transformer中自注意力与交叉注意力交替，
+        需要逐对计算。
+        """
+        self.ref_feats = None
+        try:
+            with torch.inference_mode():
+                feat_c0, feat_f0 = self.loftr_matcher.backbone(ref_tensor)
+                feat_c0 = self.loftr_matcher.pos_encoding(feat_c0)
+            self.ref_feats = (feat_c0, feat_f0, ref_tensor.shape[2:])
+            logger.info("参考图像LoFTR骨干网络特征已缓存")
+        except Exception as e:
+            logger.warning(f"参考图像特征缓存失败，使用完整LoFTR前向: {e}")
+    
+    def run_loftr_cached(self, curr_tensor):
+        """使用缓存的参考图像特征运行LoFTR，仅对当前图像计算骨干网络"""
+        matcher = self.loftr_matcher
+        feat_c0, feat_f0, hw0_i = self.ref_feats
+        feat_c1, feat_f1 = matcher.backbone(curr_tensor)
+        
+        data = {
+            'bs': curr_tensor.size(0),
+            'hw0_i': hw0_i, 'hw1_i': curr_tensor.shape[2:],
+            'hw0_c': feat_c0.shape[2:], 'hw1_c': feat_c1.shape[2:],
+            'hw0_f': feat_f0.shape[2:], 'hw1_f': feat_f1.shape[2:],
+        }
+        
+        # 展平为序列 [N, HW, C]
+        seq_c0 = feat_c0.permute(0, 2, 3, 1)
+        seq_c0 = seq_c0.reshape(seq_c0.shape[0], -1, seq_c0.shape[3])
+        seq_c1 = matcher.pos_encoding(feat_c1).permute(0, 2, 3, 1)
+        seq_c1 = seq_c1.reshape(seq_c1.shape[0], -1, seq_c1.shape[3])
+        
+        # 粗匹配 + 精细化，与KF.LoFTR.forward保持一致
+        seq_c0, seq_c1 = matcher.loftr_coarse(seq_c0, seq_c1, None, None)
+        matcher.coarse_matching(seq_c0, seq_c1, data, mask_c0=None, mask_c1=None)
+        
+        feat_f0_unfold, feat_f1_unfold = matcher.fine_preprocess(feat_f0, feat_f1, seq_c0, seq_c1, data)
+        if feat_f0_unfold.size(0) != 0:
+            feat_f0_unfold, feat_f1_unfold = matcher.loftr_fine(feat_f0_unfold, feat_f1_unfold)
+        matcher.fine_matching(feat_f0_unfold, feat_f1_unfold, data)
+        
+        return {
+            'keypoints0': data['mkpts0_f'],
+            'keypoints1': data['mkpts1_f'],
+            'confidence': data['mconf'],
+        }
+    
     def match_features_loftr(self, ref_tensor_info, curr_img):
-        """使用LoFTR进行特征匹配 - 优化版"""
+        """
+        使用LoFTR进行特征匹配 - 优化版
+        
+        Returns:
+            tuple: (参考图像匹配点, 当前图像匹配点)，均为原图坐标系下的 N×2 float32 数组
+        """
         try:
             # 预处理当前图像
             curr_tensor, curr_scale, (curr_sx, curr_sy, curr_w, curr_h) = self.preprocess_for_loftr(curr_img)
@@ -323,15 +433,18 @@ class DeepLearningAlign:
             # 引用图像信息 (ref_tensor_info 就是预处理后的tensor)
             ref_tensor = ref_tensor_info
             
-            with torch.no_grad():
+            with torch.inference_mode():
                 # 准备输入数据
                 input_dict = {
                     'image0': ref_tensor,    # [1, 1, H, W]
                     'image1': curr_tensor    # [1, 1, H, W]
                 }
                 
-                # 运行LoFTR
-                correspondences = self.loftr_matcher(input_dict)
+                # 运行LoFTR（有参考特征缓存时只计算当前图像的骨干网络）
+                if self.ref_feats is not None:
+                    correspondences = self.run_loftr_cached(curr_tensor)
+                else:
+                    correspondences = self.loftr_matcher(input_dict)
                 
                 # 提取匹配结果
                 mkpts0 = correspondences['keypoints0'].cpu().numpy()  # [N, 2]
@@ -343,11 +456,10 @@ class DeepLearningAlign:
                 mask = mconf > confidence_thresh
                 mkpts0_filtered = mkpts0[mask]
                 mkpts1_filtered = mkpts1[mask]
-                mconf_filtered = mconf[mask]
                 
                 if len(mkpts0_filtered) == 0:
                     logger.warning("⚠️  没有足够置信度的匹配点")
-                    return [], [], []
+                    return self._empty_points(), self._empty_points()
                 
                 # 将坐标从填充图像转换回原始图像坐标
                 # 参考图像坐标转换 (假设使用相同的预处理)
@@ -370,33 +482,63 @@ class DeepLearningAlign:
                             (mkpts1_orig[:, 0] >= 0) & (mkpts1_orig[:, 0] < curr_w) &
                             (mkpts1_orig[:, 1] >= 0) & (mkpts1_orig[:, 1] < curr_h))
                 
-                mkpts0_final = mkpts0_orig[valid_mask]
-                mkpts1_final = mkpts1_orig[valid_mask]
-                mconf_final = mconf_filtered[valid_mask]
-                
-                # 创建OpenCV匹配格式
-                matches = []
-                kp1_list = []
-                kp2_list = []
-                
-                for i in range(len(mkpts0_final)):
-                    kp1_list.append(cv2.KeyPoint(x=mkpts0_final[i, 0], y=mkpts0_final[i, 1], size=1))
-                    kp2_list.append(cv2.KeyPoint(x=mkpts1_final[i, 0], y=mkpts1_final[i, 1], size=1))
-                    matches.append(cv2.DMatch(i, i, float(1.0 - mconf_final[i])))
+                # 直接返回坐标数组，跳过cv2.KeyPoint/DMatch的往返构造
+                mkpts0_final = np.ascontiguousarray(mkpts0_orig[valid_mask], dtype=np.float32)
+                mkpts1_final = np.ascontiguousarray(mkpts1_orig[valid_mask], dtype=np.float32)
                 
-                logger.info(f"LoFTR找到 {len(matches)} 个有效匹配")
-                return matches, kp1_list, kp2_list
+                logger.info(f"LoFTR找到 {len(mkpts0_final)} 个有效匹配")
+                return mkpts0_final, mkpts1_final
                 
         except Exception as e:
             logger.error(f"LoFTR匹配失败: {e}")
             import traceback
             traceback.print_exc()
-            return [], [], []
+            return self._empty_points(), self._empty_points()
+    
+    @staticmethod
+    def _empty_points():
+        """空的 N×2 匹配点数组"""
+        return np.empty((0, 2), dtype=np.float32)
     
 
     
+    def match_descriptors_gpu(self, desc1, desc2, ratio=0.7):
+        """
+        在GPU上进行暴力最近邻匹配 + Lowe's ratio test
+        
+        描述子归一化后一次矩阵乘法得到全部余弦相似度，再换算为L2距离做比值检验，
+        仅在最后将通过检验的索引转换为cv2.DMatch。
+        """
+        if desc1.shape[0] == 0 or desc2.shape[0] < 2:
+            return []
+        
+        with torch.inference_mode():
+            d1 = F.normalize(desc1.float(), dim=1)
+            d2 = F.normalize(desc2.float(), dim=1)
+            similarity = d1 @ d2.T
+            top2 = similarity.topk(2, dim=1)
+            
+            # 单位向量间 ||a - b||² = 2 - 2·cos(a, b)
+            dists = torch.sqrt(torch.clamp(2.0 - 2.0 * top2.values, min=0.0))
+            mask = dists[:, 0] < ratio * dists[:, 1]
+            
+            query_idx = torch.nonzero(mask).squeeze(1)
+            train_idx = top2.indices[query_idx, 0]
+            best_dists = dists[query_idx, 0]
+        
+        return [cv2.DMatch(int(q), int(t), float(d)) for q, t, d in
+                zip(query_idx.cpu().numpy(), train_idx.cpu().numpy(), best_dists.cpu().numpy())]
+    
     def match_features_traditional(self, desc1, desc2):
         """传统特征匹配"""
+        # Kornia SIFT描述子仍在设备上时，直接在GPU上匹配
+        if torch.is_tensor(desc1) and torch.is_tensor(desc2):
+            return self.match_descriptors_gpu(desc1, desc2)
+        if torch.is_tensor(desc1):
+            desc1 = desc1.cpu().numpy()
+        if torch.is_tensor(desc2):
+            desc2 = desc2.cpu().numpy()
+        
         # 使用FLANN匹配器
         FLANN_INDEX_KDTREE = 1
         index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
@@ -428,8 +570,26 @@ class DeepLearningAlign:
             return None, 0
         
         # 提取匹配点坐标
-        src_pts = np.float32([kp2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
-        dst_pts = np.float32([kp1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+        src_pts = np.float32([kp2[m.trainIdx].pt for m in matches])
+        dst_pts = np.float32([kp1[m.queryIdx].pt for m in matches])
+        
+        return self.estimate_homography_from_arrays(src_pts, dst_pts, ransac_thresh)
+    
+    def estimate_homography_from_arrays(self, src_xy, dst_xy, ransac_thresh=5.0):
+        """
+        直接基于坐标数组的单应性矩阵估计
+        
+        Args:
+            src_xy (np.ndarray): 待对齐图像上的匹配点，N×2 float32
+            dst_xy (np.ndarray): 参考图像上的匹配点，N×2 float32
+            ransac_thresh (float): RANSAC重投影阈值
+        """
+        if len(src_xy) < 4:  # OpenCV最低要求是4个点
+            logger.warning(f"匹配点数量不足 ({len(src_xy)})，无法计算单应性矩阵")
+            return None, 0
+        
+        src_pts = np.asarray(src_xy, dtype=np.float32).reshape(-1, 1, 2)
+        dst_pts = np.asarray(dst_xy, dtype=np.float32).reshape(-1, 1, 2)
         
         # 使用RANSAC估计单应性矩阵，优化参数
         homography, mask = cv2.findHomography(
@@ -444,31 +604,34 @@ class DeepLearningAlign:
         
         # 检查单应性矩阵质量
         if homography is not None:
-            # 检查条件数
+            # 检查条件数，病态矩阵直接判定失败（调用方会回退到cv2.resize），不再重跑RANSAC
             cond_num = np.linalg.cond(homography)
             if cond_num > 100000:  # 条件数过高
-                logger.warning(f"单应性矩阵条件数过高: {cond_num:.0f}，尝试降低精度要求")
-                # 尝试更宽松的参数
-                homography, mask = cv2.findHomography(
-                    src_pts, dst_pts, 
-                    cv2.RANSAC, 
-                    ransacReprojThreshold=ransac_thresh * 2,  # 更宽松
-                    maxIters=5000,
-                    confidence=0.99
-                )
-                inliers = np.sum(mask) if mask is not None else 0
+                logger.warning(f"单应性矩阵条件数过高: {cond_num:.0f}，判定为对齐失败")
+                return None, 0
         
         return homography, inliers
     
-    def align_image(self, img, homography, reference_shape):
-        """对齐图像"""
+    def align_image(self, img, homography, reference_shape, out=None):
+        """
+        对齐图像
+        
+        Args:
+            out: 可选的预分配输出缓冲区，形状与类型匹配时warpPerspective直接写入其中
+        """
         if homography is None:
             logger.warning("单应性矩阵为空，返回调整大小后的原图像")
             return cv2.resize(img, (reference_shape[1], reference_shape[0]))
         
+        dst = None
+        if out is not None and out.shape == tuple(reference_shape) \
+                and img.ndim == out.ndim and img.dtype == out.dtype:
+            dst = out
+        
         aligned_img = cv2.warpPerspective(
             img, homography, 
             (reference_shape[1], reference_shape[0]),
+            dst=dst,
             flags=cv2.INTER_LINEAR,
             borderMode=cv2.BORDER_CONSTANT,
             borderValue=(0, 0, 0)
@@ -492,7 +655,10 @@ class DeepLearningAlign:
             return False
         
         reference_path = image_files[self.reference_index]
-        reference_img = cv2.imread(reference_path)
+        
+        # 序列图像尺寸一致，按参考图像确定整批的解码降采样标志
+        self.read_flag = self.select_read_flag(reference_path)
+        reference_img = cv2.imread(reference_path, self.read_flag)
         
         if reference_img is None:
             logger.error(f"无法读取参考图像: {reference_path}")
@@ -500,9 +666,15 @@ class DeepLearningAlign:
         
         logger.info(f"使用参考图像: {Path(reference_path).name}")
         
-        # 保存参考图像尺寸供LoFTR使用
+        if self.read_flag != cv2.IMREAD_COLOR:
+            logger.info(f"启用解码降采样，处理尺寸: {reference_img.shape[1]}x{reference_img.shape[0]}")
+        
+        # 保存参考图像尺寸供LoFTR使用（降采样后的尺寸，也是warpPerspective的输出尺寸）
         self.reference_shape = reference_img.shape
         
+        # 预热编译后的LoFTR预处理
+        self.warmup_preprocess(reference_img)
+        
         # 提取参考图像特征
         ref_kp, ref_desc = self.extract_features(reference_img)
         
@@ -511,6 +683,7 @@ class DeepLearningAlign:
             if ref_desc is None:
                 logger.error("参考图像tensor提取失败")
                 return False
+            self.cache_loftr_reference(ref_desc)
             logger.info("参考图像已准备用于LoFTR匹配")
         else:
             if ref_desc is None:
@@ -528,6 +701,17 @@ class DeepLearningAlign:
         total_processed = 0
         processing_report = []
         
+        # 后台写盘线程：JPEG编码与磁盘写入移出主循环，与下一张图像的读取/推理重叠
+        write_workers = 2
+        write_pool = ThreadPoolExecutor(max_workers=write_workers)
+        pending_writes = []
+        
+        # warpPerspective输出缓冲区环：比写盘线程多一个，轮换使用，避免每张图像重新分配数MB的输出；
+        # 缓冲区再次使用前先等待上一次使用它的写盘任务完成
+        warp_bufs = [np.empty(self.reference_shape, dtype=np.uint8) for _ in range(write_workers + 1)]
+        buf_writes = [None] * len(warp_bufs)
+        next_buf = 0
+        
         # 处理其他图像
         for i, img_path in enumerate(image_files):
             if i == self.reference_index:
@@ -537,7 +721,7 @@ class DeepLearningAlign:
             start_time = time.time()
             
             # 读取当前图像
-            current_img = cv2.imread(img_path)
+            current_img = cv2.imread(img_path, self.read_flag)
             if current_img is None:
                 logger.warning(f"无法读取图像: {img_path}")
                 continue
@@ -552,14 +736,14 @@ class DeepLearningAlign:
             # 检查是否使用LoFTR
             if hasattr(self, 'use_loftr') and self.use_loftr and hasattr(self, 'loftr_matcher'):
                 # LoFTR直接匹配两张图像
-                matches, matched_kp1, matched_kp2 = self.match_features_loftr(ref_desc, current_img)
-                match_points = len(matches)
+                ref_pts, curr_pts = self.match_features_loftr(ref_desc, current_img)
+                match_points = len(ref_pts)
                 
                 logger.info(f"LoFTR找到 {match_points} 个匹配点")
                 
                 if match_points >= 4:
                     # 使用更宽松的RANSAC参数
-                    homography, inliers = self.estimate_homography_robust(matched_kp1, matched_kp2, matches, ransac_thresh=8.0)
+                    homography, inliers = self.estimate_homography_from_arrays(curr_pts, ref_pts, ransac_thresh=8.0)
                     
                     if homography is not None:
                         logger.info(f"LoFTR对齐成功，内点数量: {inliers}")
@@ -588,12 +772,19 @@ class DeepLearningAlign:
                     else:
                         logger.warning("superpoint对齐失败")
             
-            # 对齐图像
-            aligned_img = self.align_image(current_img, homography, reference_img.shape)
+            # 对齐图像（写入环中下一个空闲缓冲区）
+            if buf_writes[next_buf] is not None:
+                buf_writes[next_buf].result()
+            aligned_img = self.align_image(current_img, homography, reference_img.shape,
+                                           out=warp_bufs[next_buf])
             
             # 保存对齐后的图像
             output_path = self.output_dir / Path(img_path).name
-            cv2.imwrite(str(output_path), aligned_img)
+            write_future = write_pool.submit(cv2.imwrite, str(output_path), aligned_img, JPEG_WRITE_PARAMS)
+            pending_writes.append((output_path, write_future))
+            if aligned_img is warp_bufs[next_buf]:
+                buf_writes[next_buf] = write_future
+                next_buf = (next_buf + 1) % len(warp_bufs)
             
             processing_time = time.time() - start_time
             success = homography is not None
@@ -614,6 +805,12 @@ class DeepLearningAlign:
             
             logger.info(f"保存对齐图像: {output_path} (深度学习, {processing_time:.2f}秒)")
         
+        # 等待所有后台写盘完成
+        write_pool.shutdown(wait=True)
+        for output_path, future in pending_writes:
+            if not future.result():
+                logger.warning(f"保存对齐图像失败: {output_path}")
+        
         # 输出统计结果
         logger.info("=" * 60)
         logger.info("SuperPoint对齐处理统计:")
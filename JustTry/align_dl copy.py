@@ -22,6 +22,7 @@ import logging
 import time
 import sys
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from tqdm import tqdm
 warnings.filterwarnings('ignore')
@@ -31,6 +32,9 @@ import torch
 import torch.nn.functional as F
 TORCH_AVAILABLE = True
 
+# 推理输入尺寸固定，让cuDNN为每个卷积自动选择最快算法
+torch.backends.cudnn.benchmark = True
+
 import os
 os.environ["CUDA_VISIBLE_DEVICES"] = "0"  # 指定使用的GPU
 
@@ -51,10 +55,51 @@ except ImportError:
     LOFTR_AVAILABLE = False
 
 try:
-    from scipy.ndimage import maximum_filter
-    SCIPY_AVAILABLE = True
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
 except ImportError:
-    SCIPY_AVAILABLE = False
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    # fastmath不含nnan/ninf：次似值以-inf为初值（只有一列时保持-inf），需要按IEEE语义比较
+    @njit(parallel=True, fastmath={'nsz', 'arcp', 'contract', 'reassoc'}, cache=True)
+    def _ratio_mutual_nn(sim, best_thresh, ratio_thresh):
+        """CPU上的比率测试 + 互相最近邻，返回每行的 (是否保留, 最佳列, 距离)"""
+        n, m = sim.shape
+        
+        # 每列的最佳行索引
+        col_best = np.empty(m, np.int64)
+        for j in prange(m):
+            best_i = 0
+            best_v = sim[0, j]
+            for i in range(1, n):
+                if sim[i, j] > best_v:
+                    best_v = sim[i, j]
+                    best_i = i
+            col_best[j] = best_i
+        
+        keep = np.zeros(n, np.bool_)
+        best_j = np.empty(n, np.int64)
+        dist = np.empty(n, np.float32)
+        for i in prange(n):
+            # 单次线性扫描找最似和次似
+            v1 = -np.inf
+            v2 = -np.inf
+            j1 = 0
+            for j in range(m):
+                v = sim[i, j]
+                if v > v1:
+                    v2 = v1
+                    v1 = v
+                    j1 = j
+                elif v > v2:
+                    v2 = v
+            best_j[i] = j1
+            dist[i] = 1.0 - v1
+            keep[i] = (v1 > best_thresh) and (v1 / (v2 + 1e-8) > ratio_thresh) and (col_best[j1] == i)
+        return keep, best_j, dist
+
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff'})
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -67,7 +112,7 @@ class DeepLearningAlign:
     支持多种深度学习特征匹配方法，对传统方法难以处理的场景提供更好的解决方案。
     """
     
-    def __init__(self, input_dir="Lib", output_dir="DL-Align", reference_index=0, method="superpoint"):
+    def __init__(self, input_dir="Lib", output_dir="DL-Align", reference_index=0, method="superpoint", batch_size=8):
         """
         初始化深度学习对齐器
         
@@ -76,11 +121,13 @@ class DeepLearningAlign:
             output_dir (str): 输出对齐图像文件夹路径
             reference_index (int): 参考图像索引
             method (str): 使用的深度学习方法 ('superpoint', 'loftr', 'sift_dl')
+            batch_size (int): 每批送入网络的图像数量
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.reference_index = reference_index
         self.method = method
+        self.batch_size = max(1, batch_size)
         
         # 创建输出目录
         self.output_dir.mkdir(exist_ok=True)
@@ -96,9 +143,16 @@ class DeepLearningAlign:
             self.device = 'cpu'
             logger.warning("PyTorch未安装，将使用CPU和传统方法")
         
+        # 按形状缓存的锁页暂存缓冲区：shape -> (pinned tensor, 上一次拷贝完成事件)
+        self._pinned_staging = {}
+        
         # 初始化深度学习模型
         self.init_models()
         
+    def autocast(self):
+        """CUDA上启用FP16自动混合精度，CPU上不生效"""
+        return torch.cuda.amp.autocast(enabled=torch.device(self.device).type == 'cuda', dtype=torch.float16)
+    
     def init_models(self):
         """初始化深度学习模型"""
         logger.info(f"初始化深度学习模型: {self.method}")
@@ -114,6 +168,27 @@ class DeepLearningAlign:
         else:
             logger.warning(f"未知方法 {self.method}，回退到传统SIFT")
             self.init_traditional_sift()
+        
+        self.bind_methods()
+    
+    def bind_methods(self):
+        """
+        模型初始化完成后一次性确定特征提取/匹配函数，
+        避免在每帧的热路径上反复 hasattr 分支判断
+        """
+        self._use_loftr = getattr(self, 'use_loftr', False) and hasattr(self, 'loftr_matcher')
+        
+        if self.method == "superpoint" and (hasattr(self, 'loftr_matcher') or hasattr(self, 'kornia_sift')):
+            self._extract_fn = self.extract_features_kornia
+        elif self.method in ["loftr", "lightweight"] and hasattr(self, 'feature_extractor'):
+            self._extract_fn = self.extract_features_lightweight_checked
+        else:
+            self._extract_fn = self.extract_features_sift
+        
+        if hasattr(self, 'matcher') and self.method == "sift_dl":
+            self._match_fn = self.match_with_dl_matcher
+        else:
+            self._match_fn = self.match_features_traditional
     
     def init_superpoint(self):
         """初始化Kornia特征检测器（优先使用LoFTR，回退到SIFT）"""
@@ -271,6 +346,8 @@ class DeepLearningAlign:
                 }
         
         self.feature_extractor = EnhancedFeatureExtractor().to(self.device).eval()
+        # 推理使用channels-last(NHWC)布局，cuDNN可直接选用Tensor Core卷积核
+        self.feature_extractor = self.feature_extractor.to(memory_format=torch.channels_last)
         logger.info("增强版特征提取器初始化成功")
         self.model_available = True
     
@@ -288,11 +365,10 @@ class DeepLearningAlign:
                     torch.nn.Sigmoid()
                 )
             
-            def forward(self, desc1, desc2):
-                # 计算描述符相似度
-                combined = torch.cat([desc1, desc2], dim=-1)
-                similarity = self.matcher(combined)
-                return similarity
+            def forward(self, pairs):
+                # pairs: 已拼接的描述符对 [B, 2D]，返回相似度 [B]
+                similarity = self.matcher(pairs)
+                return similarity.squeeze(-1)
         
         self.matcher = LightweightMatcher().to(self.device).eval()
         self.model_available = True
@@ -305,15 +381,10 @@ class DeepLearningAlign:
         self.model_available = True
     
     def get_image_files(self):
-        """获取输入目录中的所有图像文件"""
-        image_files = []
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        
-        for ext in image_extensions:
-            image_files.extend(list(self.input_dir.rglob(f"*{ext}")))
-            image_files.extend(list(self.input_dir.rglob(f"*{ext.upper()}")))
-        
-        image_files = list(set([str(f) for f in image_files]))
+        """获取输入目录中的所有图像文件（单次遍历，后缀不区分大小写）"""
+        # 每个文件只遍历到一次，无需set去重
+        image_files = [str(f) for f in self.input_dir.rglob("*")
+                       if f.suffix.lower() in IMAGE_EXTENSIONS and f.is_file()]
         image_files.sort()
         return image_files
     
@@ -329,30 +400,79 @@ class DeepLearningAlign:
             processed_img: 预处理后的图像tensor
             scale_factor: 缩放因子
         """
-        # 转换为灰度图像
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = img
+        tensor_img, scales = self.preprocess_batch([img], target_size)
+        return tensor_img, scales[0], tuple(tensor_img.shape[2:])
+    
+    def preprocess_batch(self, imgs, target_size=512):
+        """
+        批量预处理同尺寸图像，堆叠为 [B, 1, H, W] tensor
         
-        # 计算缩放因子
-        h, w = gray.shape
-        scale = target_size / max(h, w)
-        new_h, new_w = int(h * scale), int(w * scale)
+        Returns:
+            batch_tensor: 预处理后的图像tensor
+            scales: 每张图像的缩放因子
+        """
+        resized_list = []
+        scales = []
+        for img in imgs:
+            # 转换为灰度图像
+            if len(img.shape) == 3:
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = img
+            
+            # 计算缩放因子
+            h, w = gray.shape
+            scale = target_size / max(h, w)
+            new_h, new_w = int(h * scale), int(w * scale)
+            
+            # 调整大小
+            resized_list.append(cv2.resize(gray, (new_w, new_h)))
+            scales.append(scale)
         
-        # 调整大小
-        resized = cv2.resize(gray, (new_w, new_h))
+        # 以uint8上传，在设备上归一化
+        batch_tensor = self.upload_gray(np.stack(resized_list)).unsqueeze(1)
+        # 在输入边界转换一次布局，与特征提取器的channels-last权重一致
+        batch_tensor = batch_tensor.contiguous(memory_format=torch.channels_last)
         
-        # 转换为tensor
-        tensor_img = torch.from_numpy(resized).float() / 255.0
-        tensor_img = tensor_img.unsqueeze(0).unsqueeze(0).to(self.device)
+        return batch_tensor, scales
+    
+    def upload_u8(self, arr):
+        """
+        将uint8数组上传到设备
+        
+        CUDA上经按形状复用的锁页暂存缓冲区异步拷贝：锁页缓冲区只在首次遇到该形状时分配，
+        之后每次只做一次主机内存拷贝；覆盖缓冲区前等待上一次从它发出的拷贝完成
+        """
+        host = torch.from_numpy(np.ascontiguousarray(arr))
+        if torch.device(self.device).type != 'cuda':
+            return host.to(self.device)
+        
+        entry = self._pinned_staging.get(host.shape)
+        if entry is None:
+            staging = torch.empty(host.shape, dtype=torch.uint8, pin_memory=True)
+        else:
+            staging, copied = entry
+            copied.synchronize()
+        staging.copy_(host)
+        tensor_u8 = staging.to(self.device, non_blocking=True)
         
-        return tensor_img, scale, (new_h, new_w)
+        copied = torch.cuda.Event()
+        copied.record()
+        self._pinned_staging[host.shape] = (staging, copied)
+        return tensor_u8
+    
+    def upload_gray(self, gray):
+        """
+        将uint8灰度数组上传到设备并归一化到 [0, 1]
+        
+        以uint8传输（带宽为float32的1/4），类型转换和除法在设备上完成
+        """
+        return self.upload_u8(gray).float().mul_(1.0 / 255.0)
     
     def extract_features_kornia(self, img):
         """使用Kornia特征检测器提取特征"""
         try:
-            if hasattr(self, 'use_loftr') and self.use_loftr:
+            if self._use_loftr:
                 # 对于LoFTR，返回预处理后的tensor
                 tensor_result, scale, bbox = self.preprocess_for_loftr(img)
                 logger.info("LoFTR特征准备完成")
@@ -366,24 +486,25 @@ class DeepLearningAlign:
                     gray = img
                     
                 # 转换为tensor
-                img_tensor = torch.from_numpy(gray).float().unsqueeze(0).unsqueeze(0).to(self.device) / 255.0
+                img_tensor = self.upload_gray(gray).unsqueeze(0).unsqueeze(0)
                 
                 # 使用Kornia SIFT
-                lafs, responses, descriptors = self.kornia_sift(img_tensor)
+                with torch.no_grad(), self.autocast():
+                    lafs, responses, descriptors = self.kornia_sift(img_tensor)
+                lafs, descriptors = lafs.float(), descriptors.float()
                 
                 if lafs.shape[1] > 0:
-                    # 转换LAFs到关键点
-                    lafs_np = lafs[0].cpu().numpy()  # [N, 2, 3]
-                    keypoints = []
-                    
-                    for laf in lafs_np:
-                        # LAF格式转换为关键点坐标
-                        x, y = laf[0, 2], laf[1, 2]  # 中心坐标
-                        # 计算尺度
-                        scale = np.sqrt(laf[0, 0]**2 + laf[0, 1]**2)
-                        keypoints.append(cv2.KeyPoint(x=float(x), y=float(y), size=float(scale)))
+                    # LAF与描述符拼接后一次拷回CPU，只同步一次
+                    num_kp = lafs.shape[1]
+                    packed = torch.cat([lafs[0].reshape(num_kp, 6), descriptors[0]], dim=1).cpu().numpy()
+                    lafs_np = packed[:, :6].reshape(num_kp, 2, 3)  # [N, 2, 3]
+                    desc_np = np.ascontiguousarray(packed[:, 6:])  # [N, 128]
                     
-                    desc_np = descriptors[0].cpu().numpy().T  # [N, 128]
+                    # LAF格式转换为关键点坐标（向量化）
+                    xs = lafs_np[:, 0, 2]  # 中心坐标
+                    ys = lafs_np[:, 1, 2]
+                    scales = np.sqrt(lafs_np[:, 0, 0]**2 + lafs_np[:, 0, 1]**2)  # 计算尺度
+                    keypoints = [cv2.KeyPoint(x, y, s) for x, y, s in zip(xs.tolist(), ys.tolist(), scales.tolist())]
                     
                     logger.info(f"Kornia SIFT特征提取: {len(keypoints)}个关键点")
                     return keypoints, desc_np
@@ -397,70 +518,72 @@ class DeepLearningAlign:
     
     def extract_features_lightweight(self, img):
         """使用增强版网络提取特征"""
+        return self.extract_features_lightweight_batch([img])[0]
+    
+    def extract_features_lightweight_batch(self, imgs):
+        """使用增强版网络批量提取特征：整批图像一次前向"""
+        # 不同尺寸的图像无法堆叠，逐张处理
+        if len({img.shape[:2] for img in imgs}) > 1:
+            return [self.extract_features_lightweight_batch([img])[0] for img in imgs]
+        
         try:
-            processed_img, scale, (h, w) = self.preprocess_image(img, target_size=640)
+            processed_imgs, scales = self.preprocess_batch(imgs, target_size=640)
             
             with torch.no_grad():
-                # 特征提取
-                output = self.feature_extractor(processed_img)
-                descriptors_map = output['descriptors']
-                keypoint_scores = output['keypoint_scores']
-                
-                # 关键点检测：使用非最大值抑制
-                scores = keypoint_scores[0, 0].cpu().numpy()
-                
-                # 使用更好的关键点检测
-                if SCIPY_AVAILABLE:
-                    from scipy.ndimage import maximum_filter
-                    local_max = maximum_filter(scores, size=3) == scores  # 减小窗口
-                    coords = np.where(local_max & (scores > 0.15))  # 降低阈值
-                else:
-                    # 简单的局部最大值检测
-                    threshold = np.percentile(scores, 85)  # 降低百分位
-                    coords = np.where(scores > max(threshold, 0.15))
+                # 特征提取（FP16），输出转回FP32供后续NumPy/OpenCV处理
+                with self.autocast():
+                    output = self.feature_extractor(processed_imgs)
+                descriptors_map = output['descriptors'].float()
+                keypoint_scores = output['keypoint_scores'].float()
                 
-                if len(coords[0]) == 0:
-                    logger.warning("未检测到足够的关键点")
-                    return self.extract_features_sift(img)
-                
-                # 限制关键点数量
-                max_keypoints = 2000  # 增加关键点数量
-                if len(coords[0]) > max_keypoints:
-                    # 按分数排序并选择最好的
-                    point_scores = scores[coords]
-                    top_indices = np.argsort(point_scores)[-max_keypoints:]
-                    coords = (coords[0][top_indices], coords[1][top_indices])
-                
-                # 构建关键点和描述符
-                keypoints = []
-                descriptors = []
-                
-                desc_map = descriptors_map[0].cpu().numpy()  # [256, H, W]
-                
-                for y, x in zip(coords[0], coords[1]):
-                    # 缩放回原始图像坐标
-                    scale_factor = 8  # 下采样倍数
-                    orig_x = (x * scale_factor) / scale
-                    orig_y = (y * scale_factor) / scale
-                    
-                    if 0 <= orig_x < img.shape[1] and 0 <= orig_y < img.shape[0]:
-                        keypoints.append(cv2.KeyPoint(x=float(orig_x), y=float(orig_y), size=8.0))
-                        
-                        # 提取描述符
-                        if y < desc_map.shape[1] and x < desc_map.shape[2]:
-                            desc = desc_map[:, y, x]  # [256]
-                            descriptors.append(desc)
-                
-                if descriptors and len(descriptors) > 10:  # 提高最小特征点要求
-                    descriptors = np.array(descriptors)  # [N, 256]
-                    logger.info(f"深度学习特征提取: {len(keypoints)}个关键点")
-                    return keypoints, descriptors
-                else:
-                    logger.warning(f"深度学习特征提取结果不佳({len(descriptors) if descriptors else 0}个特征点)，切换到SIFT")
-                    return self.extract_features_sift(img)
+                return [self.keypoints_from_maps(img, scale, descriptors_map[b:b + 1], keypoint_scores[b:b + 1])
+                        for b, (img, scale) in enumerate(zip(imgs, scales))]
                     
         except Exception as e:
             logger.error(f"深度学习特征提取失败: {e}")
+            return [self.extract_features_sift(img) for img in imgs]
+    
+    def keypoints_from_maps(self, img, scale, descriptors_map, keypoint_scores):
+        """从单张图像的描述符图 [1, 256, H, W] 和关键点分数图 [1, 1, H, W] 提取关键点与描述符"""
+        # 关键点检测：在GPU上用 max_pool2d 做 3x3 非最大值抑制
+        pooled = F.max_pool2d(keypoint_scores, kernel_size=3, stride=1, padding=1)
+        local_max = (pooled == keypoint_scores) & (keypoint_scores > 0.15)  # 降低阈值
+        
+        # 限制关键点数量：在GPU上对NMS后的分数取top-K
+        max_keypoints = 2000  # 增加关键点数量
+        masked_scores = torch.where(local_max, keypoint_scores, torch.zeros_like(keypoint_scores)).flatten()
+        num_candidates = int(local_max.sum())
+        if num_candidates == 0:
+            logger.warning("未检测到足够的关键点")
+            return self.extract_features_sift(img)
+        
+        _, flat_idx = masked_scores.topk(min(max_keypoints, num_candidates))
+        map_w = keypoint_scores.shape[3]
+        ys_t = flat_idx // map_w
+        xs_t = flat_idx % map_w
+        
+        # 在设备上一次性gather描述符 [N, 256]，只把最终结果拷回CPU
+        descriptors = descriptors_map[0, :, ys_t, xs_t].t().cpu().numpy()
+        ys = ys_t.cpu().numpy()
+        xs = xs_t.cpu().numpy()
+        
+        # 缩放回原始图像坐标（向量化）
+        scale_factor = 8  # 下采样倍数
+        orig_x = (xs * scale_factor) / scale
+        orig_y = (ys * scale_factor) / scale
+        
+        valid = ((orig_x >= 0) & (orig_x < img.shape[1]) &
+                 (orig_y >= 0) & (orig_y < img.shape[0]))
+        descriptors = descriptors[valid]
+        orig_x, orig_y = orig_x[valid], orig_y[valid]
+        
+        keypoints = [cv2.KeyPoint(x=float(x), y=float(y), size=8.0) for x, y in zip(orig_x, orig_y)]
+        
+        if len(descriptors) > 10:  # 提高最小特征点要求
+            logger.info(f"深度学习特征提取: {len(keypoints)}个关键点")
+            return keypoints, descriptors
+        else:
+            logger.warning(f"深度学习特征提取结果不佳({len(descriptors)}个特征点)，切换到SIFT")
             return self.extract_features_sift(img)
     
     def extract_features_sift(self, img):
@@ -474,19 +597,25 @@ class DeepLearningAlign:
         return keypoints, descriptors
     
     def extract_features(self, img):
-        """根据方法提取特征"""
-        if self.method == "superpoint" and (hasattr(self, 'loftr_matcher') or hasattr(self, 'kornia_sift')):
-            return self.extract_features_kornia(img)
-        elif self.method in ["loftr", "lightweight"] and hasattr(self, 'feature_extractor'):
-            # 尝试深度学习方法，如果失败则自动回退到SIFT
-            dl_result = self.extract_features_lightweight(img)
-            if dl_result[1] is not None and len(dl_result[1]) >= 50:  # 如果有足够的特征点
-                return dl_result
-            else:
-                logger.info("深度学习特征不足，使用SIFT补充")
-                return self.extract_features_sift(img)
-        else:
-            return self.extract_features_sift(img)
+        """根据方法提取特征（提取函数在初始化时已绑定）"""
+        return self._extract_fn(img)
+    
+    def extract_features_lightweight_checked(self, img):
+        """尝试深度学习方法，特征点不足时自动回退到SIFT"""
+        return self.extract_features_batch([img])[0]
+    
+    def extract_features_batch(self, imgs):
+        """批量提取特征，轻量级网络整批前向，其余方法逐张处理"""
+        if self._extract_fn == self.extract_features_lightweight_checked:
+            results = []
+            for img, dl_result in zip(imgs, self.extract_features_lightweight_batch(imgs)):
+                if dl_result[1] is not None and len(dl_result[1]) >= 50:  # 如果有足够的特征点
+                    results.append(dl_result)
+                else:
+                    logger.info("深度学习特征不足，使用SIFT补充")
+                    results.append(self.extract_features_sift(img))
+            return results
+        return [self._extract_fn(img) for img in imgs]
     
     def preprocess_for_loftr(self, img, target_size=640):
         """专为LoFTR优化的图像预处理"""
@@ -513,88 +642,98 @@ class DeepLearningAlign:
         padded[start_y:start_y+new_h, start_x:start_x+new_w] = resized
         
         # 转换为tensor
-        tensor_img = torch.from_numpy(padded).float().unsqueeze(0).unsqueeze(0).to(self.device) / 255.0
+        tensor_img = self.upload_gray(padded).unsqueeze(0).unsqueeze(0)
         
         return tensor_img, scale, (start_x, start_y, new_w, new_h)
 
     def match_features_loftr(self, ref_tensor_info, curr_img):
         """使用LoFTR进行特征匹配 - 优化版"""
+        return self.match_features_loftr_batch(ref_tensor_info, [curr_img])[0]
+    
+    def match_features_loftr_batch(self, ref_tensor_info, curr_imgs):
+        """使用LoFTR批量匹配：参考图像广播为image0，整批当前图像作为image1一次前向"""
         try:
-            # 预处理当前图像
-            curr_tensor, curr_scale, (curr_sx, curr_sy, curr_w, curr_h) = self.preprocess_for_loftr(curr_img)
+            # 预处理当前图像（统一填充到相同尺寸，可直接堆叠）
+            preprocessed = [self.preprocess_for_loftr(img) for img in curr_imgs]
+            curr_tensor = torch.cat([p[0] for p in preprocessed], dim=0)
             
             # 引用图像信息 (ref_tensor_info 就是预处理后的tensor)
-            ref_tensor = ref_tensor_info
+            ref_tensor = ref_tensor_info.expand(len(curr_imgs), -1, -1, -1)
             
             with torch.no_grad():
                 # 准备输入数据
                 input_dict = {
-                    'image0': ref_tensor,    # [1, 1, H, W]
-                    'image1': curr_tensor    # [1, 1, H, W]
+                    'image0': ref_tensor,    # [B, 1, H, W]
+                    'image1': curr_tensor    # [B, 1, H, W]
                 }
                 
                 # 运行LoFTR
-                correspondences = self.loftr_matcher(input_dict)
+                with self.autocast():
+                    correspondences = self.loftr_matcher(input_dict)
                 
                 # 提取匹配结果
-                mkpts0 = correspondences['keypoints0'].cpu().numpy()  # [N, 2]
-                mkpts1 = correspondences['keypoints1'].cpu().numpy()  # [N, 2]
-                mconf = correspondences['confidence'].cpu().numpy()   # [N]
-                
-                # 使用更低的置信度阈值
-                confidence_thresh = 0.1
-                mask = mconf > confidence_thresh
-                mkpts0_filtered = mkpts0[mask]
-                mkpts1_filtered = mkpts1[mask]
-                mconf_filtered = mconf[mask]
-                
-                if len(mkpts0_filtered) == 0:
-                    logger.warning("⚠️  没有足够置信度的匹配点")
-                    return [], [], []
-                
-                # 将坐标从填充图像转换回原始图像坐标
-                # 参考图像坐标转换 (假设使用相同的预处理)
-                ref_scale = curr_scale  # 假设参考图像用相同预处理
-                mkpts0_orig = mkpts0_filtered.copy()
-                mkpts0_orig[:, 0] = (mkpts0_orig[:, 0] - curr_sx) / ref_scale
-                mkpts0_orig[:, 1] = (mkpts0_orig[:, 1] - curr_sy) / ref_scale
-                
-                # 当前图像坐标转换
-                mkpts1_orig = mkpts1_filtered.copy()
-                mkpts1_orig[:, 0] = (mkpts1_orig[:, 0] - curr_sx) / curr_scale
-                mkpts1_orig[:, 1] = (mkpts1_orig[:, 1] - curr_sy) / curr_scale
-                
-                # 过滤超出原始图像边界的点
-                ref_h, ref_w = self.reference_shape[:2]
-                curr_h, curr_w = curr_img.shape[:2]
-                
-                valid_mask = ((mkpts0_orig[:, 0] >= 0) & (mkpts0_orig[:, 0] < ref_w) &
-                            (mkpts0_orig[:, 1] >= 0) & (mkpts0_orig[:, 1] < ref_h) &
-                            (mkpts1_orig[:, 0] >= 0) & (mkpts1_orig[:, 0] < curr_w) &
-                            (mkpts1_orig[:, 1] >= 0) & (mkpts1_orig[:, 1] < curr_h))
-                
-                mkpts0_final = mkpts0_orig[valid_mask]
-                mkpts1_final = mkpts1_orig[valid_mask]
-                mconf_final = mconf_filtered[valid_mask]
-                
-                # 创建OpenCV匹配格式
-                matches = []
-                kp1_list = []
-                kp2_list = []
-                
-                for i in range(len(mkpts0_final)):
-                    kp1_list.append(cv2.KeyPoint(x=mkpts0_final[i, 0], y=mkpts0_final[i, 1], size=1))
-                    kp2_list.append(cv2.KeyPoint(x=mkpts1_final[i, 0], y=mkpts1_final[i, 1], size=1))
-                    matches.append(cv2.DMatch(i, i, float(1.0 - mconf_final[i])))
-                
-                logger.info(f"LoFTR找到 {len(matches)} 个有效匹配")
-                return matches, kp1_list, kp2_list
+                mkpts0 = correspondences['keypoints0'].float().cpu().numpy()  # [N, 2]
+                mkpts1 = correspondences['keypoints1'].float().cpu().numpy()  # [N, 2]
+                mconf = correspondences['confidence'].float().cpu().numpy()   # [N]
+                batch_idx = correspondences['batch_indexes'].cpu().numpy()    # [N]
+            
+            results = []
+            for b, (curr_img, (_, curr_scale, (curr_sx, curr_sy, _, _))) in enumerate(zip(curr_imgs, preprocessed)):
+                in_batch = batch_idx == b
+                results.append(self.loftr_to_cv_matches(
+                    mkpts0[in_batch], mkpts1[in_batch], mconf[in_batch],
+                    curr_img, curr_scale, curr_sx, curr_sy))
+            return results
                 
         except Exception as e:
             logger.error(f"LoFTR匹配失败: {e}")
             import traceback
             traceback.print_exc()
+            return [([], [], []) for _ in curr_imgs]
+    
+    def loftr_to_cv_matches(self, mkpts0, mkpts1, mconf, curr_img, curr_scale, curr_sx, curr_sy):
+        """将单张图像的LoFTR匹配结果转换回原图坐标并生成OpenCV匹配格式"""
+        # 使用更低的置信度阈值
+        confidence_thresh = 0.1
+        mask = mconf > confidence_thresh
+        mkpts0_filtered = mkpts0[mask]
+        mkpts1_filtered = mkpts1[mask]
+        mconf_filtered = mconf[mask]
+        
+        if len(mkpts0_filtered) == 0:
+            logger.warning("⚠️  没有足够置信度的匹配点")
             return [], [], []
+        
+        # 将坐标从填充图像转换回原始图像坐标
+        # 参考图像坐标转换 (假设使用相同的预处理)
+        ref_scale = curr_scale  # 假设参考图像用相同预处理
+        mkpts0_orig = mkpts0_filtered.copy()
+        mkpts0_orig[:, 0] = (mkpts0_orig[:, 0] - curr_sx) / ref_scale
+        mkpts0_orig[:, 1] = (mkpts0_orig[:, 1] - curr_sy) / ref_scale
+        
+        # 当前图像坐标转换
+        mkpts1_orig = mkpts1_filtered.copy()
+        mkpts1_orig[:, 0] = (mkpts1_orig[:, 0] - curr_sx) / curr_scale
+        mkpts1_orig[:, 1] = (mkpts1_orig[:, 1] - curr_sy) / curr_scale
+        
+        # 过滤超出原始图像边界的点
+        ref_h, ref_w = self.reference_shape[:2]
+        curr_h, curr_w = curr_img.shape[:2]
+        
+        valid_mask = (np.all((mkpts0_orig >= 0) & (mkpts0_orig < np.array([ref_w, ref_h])), axis=1) &
+                      np.all((mkpts1_orig >= 0) & (mkpts1_orig < np.array([curr_w, curr_h])), axis=1))
+        
+        mkpts0_final = mkpts0_orig[valid_mask]
+        mkpts1_final = mkpts1_orig[valid_mask]
+        distances = (1.0 - mconf_filtered[valid_mask]).astype(np.float32)
+        
+        # 创建OpenCV匹配格式
+        kp1_list = [cv2.KeyPoint(float(x), float(y), 1) for x, y in mkpts0_final.tolist()]
+        kp2_list = [cv2.KeyPoint(float(x), float(y), 1) for x, y in mkpts1_final.tolist()]
+        matches = [cv2.DMatch(i, i, d) for i, d in enumerate(distances.tolist())]
+        
+        logger.info(f"LoFTR找到 {len(matches)} 个有效匹配")
+        return matches, kp1_list, kp2_list
     
     def match_features_dl(self, desc1, desc2, kp1, kp2):
         """使用深度学习方法匹配特征"""
@@ -602,11 +741,8 @@ class DeepLearningAlign:
             return []
         
         try:
-            # 如果有深度学习匹配器
-            if hasattr(self, 'matcher') and self.method == "sift_dl":
-                return self.match_with_dl_matcher(desc1, desc2)
-            else:
-                return self.match_features_traditional(desc1, desc2)
+            # 深度学习匹配器或传统匹配（初始化时已绑定）
+            return self._match_fn(desc1, desc2)
                 
         except Exception as e:
             logger.warning(f"深度学习匹配失败: {e}，使用传统方法")
@@ -614,6 +750,10 @@ class DeepLearningAlign:
     
     def match_with_dl_matcher(self, desc1, desc2):
         """使用深度学习匹配器（优化版）"""
+        # 参考描述符已常驻GPU，避免每帧重复上传
+        if desc1 is getattr(self, 'ref_desc', None) and hasattr(self, 'ref_desc_gpu'):
+            desc1 = self.ref_desc_gpu
+        
         if hasattr(self, 'matcher'):
             # 使用可学习的匹配器
             return self.match_with_learned_matcher(desc1, desc2)
@@ -622,88 +762,142 @@ class DeepLearningAlign:
             return self.match_with_cosine_similarity(desc1, desc2)
     
     def match_with_cosine_similarity(self, desc1, desc2):
-        """使用余弦相似度进行特征匹配"""
-        desc1_tensor = torch.from_numpy(desc1).float().to(self.device)
+        """使用余弦相似度进行特征匹配（desc1 可为已在GPU上的tensor）"""
+        if torch.is_tensor(desc1):
+            desc1_tensor = desc1
+        else:
+            desc1_tensor = torch.from_numpy(desc1).float().to(self.device)
         desc2_tensor = torch.from_numpy(desc2).float().to(self.device)
         
-        # 归一化描述符
-        desc1_norm = F.normalize(desc1_tensor, p=2, dim=1)
+        # 归一化描述符（参考描述符的归一化结果已预先缓存）
+        if desc1_tensor is getattr(self, 'ref_desc_gpu', None):
+            desc1_norm = self.ref_desc_norm_gpu
+        else:
+            desc1_norm = F.normalize(desc1_tensor, p=2, dim=1)
         desc2_norm = F.normalize(desc2_tensor, p=2, dim=1)
         
         # 计算相似度矩阵
         similarity_matrix = torch.mm(desc1_norm, desc2_norm.t())
         
-        matches = []
+        n1 = similarity_matrix.shape[0]
+        if n1 == 0 or similarity_matrix.shape[1] < 2:
+            return []
         
-        # 互相最近邻匹配
-        for i in range(similarity_matrix.shape[0]):
-            # 找到最似和次似的匹配
-            similarities = similarity_matrix[i]
-            sorted_indices = torch.argsort(similarities, descending=True)
-            
-            if len(sorted_indices) >= 2:
-                best_idx = sorted_indices[0]
-                second_best_idx = sorted_indices[1]
-                
-                best_sim = similarities[best_idx]
-                second_sim = similarities[second_best_idx]
-                
-                # Lowe's ratio test for cosine similarity
-                ratio = best_sim / (second_sim + 1e-8)
-                
-                if best_sim > 0.5 and ratio > 1.1:  # 降低匹配阈值
-                    # 检查互相最近邻
-                    reverse_best = torch.argmax(similarity_matrix[:, best_idx])
-                    if reverse_best == i:
-                        distance = float(1.0 - best_sim)
-                        matches.append(cv2.DMatch(i, int(best_idx), distance))
-        
-        return matches
-    
-    def match_with_learned_matcher(self, desc1, desc2):
-        """使用可学习的匹配器"""
-        desc1_tensor = torch.from_numpy(desc1).float().to(self.device)
+        # CPU设备上使用Numba内核，避免多次全矩阵遍历
+        if NUMBA_AVAILABLE and similarity_matrix.device.type == 'cpu':
+            keep, best_j, dist = _ratio_mutual_nn(similarity_matrix.numpy(), 0.5, 1.1)
+            return [cv2.DMatch(int(q), int(best_j[q]), float(dist[q])) for q in np.nonzero(keep)[0]]
+        
+        # 互相最近邻：在任何筛选之前一次性求出每列的最佳行索引 [M]
+        reverse_best_all = similarity_matrix.argmax(dim=0)
+        
+        # 每行最似和次似的匹配
+        top2_vals, top2_idx = similarity_matrix.topk(2, dim=1)
+        best_sim = top2_vals[:, 0]
+        best_idx = top2_idx[:, 0]
+        
+        # Lowe's ratio test for cosine similarity
+        ratio = best_sim / (top2_vals[:, 1] + 1e-8)
+        
+        # 通过一次gather检查互为最近邻
+        is_mutual = reverse_best_all[best_idx] == torch.arange(n1, device=similarity_matrix.device)
+        
+        good = (best_sim > 0.5) & (ratio > 1.1) & is_mutual  # 降低匹配阈值
+        
+        query_idx = torch.nonzero(good).squeeze(1)
+        train_idx = best_idx[query_idx].cpu().numpy()
+        distances = (1.0 - best_sim[query_idx]).cpu().numpy()
+        
+        return [cv2.DMatch(int(q), int(t), float(d)) for q, t, d in
+                zip(query_idx.cpu().numpy(), train_idx, distances)]
+    
+    def match_with_learned_matcher(self, desc1, desc2, max_pairs_per_batch=1 << 18):
+        """使用可学习的匹配器（所有候选对批量前向，desc1 可为已在GPU上的tensor）"""
+        if torch.is_tensor(desc1):
+            desc1_tensor = desc1
+        else:
+            desc1_tensor = torch.from_numpy(desc1).float().to(self.device)
         desc2_tensor = torch.from_numpy(desc2).float().to(self.device)
         
-        matches = []
+        n1, dim = desc1_tensor.shape
+        n2 = desc2_tensor.shape[0]
+        if n1 == 0 or n2 == 0:
+            return []
+        
+        # 按行分块，限制 [rows*N2, 2D] 拼接张量的显存占用
+        rows_per_batch = max(1, max_pairs_per_batch // n2)
+        best_scores = []
+        best_indices = []
         
-        # 计算所有可能的匹配对
         with torch.no_grad():
-            for i, d1 in enumerate(desc1_tensor):
-                best_match_idx = -1
-                best_similarity = 0
+            for start in range(0, n1, rows_per_batch):
+                d1 = desc1_tensor[start:start + rows_per_batch]
+                rows = d1.shape[0]
+                pairs = torch.cat([d1.unsqueeze(1).expand(rows, n2, dim),
+                                   desc2_tensor.unsqueeze(0).expand(rows, n2, dim)], dim=-1)
+                scores = self.matcher(pairs.reshape(rows * n2, 2 * dim)).reshape(rows, n2)
                 
-                for j, d2 in enumerate(desc2_tensor):
-                    similarity = self.matcher(d1.unsqueeze(0), d2.unsqueeze(0))
-                    
-                    if similarity > best_similarity and similarity > 0.6:  # 阈值
-                        best_similarity = similarity
-                        best_match_idx = j
-                
-                if best_match_idx >= 0:
-                    matches.append(cv2.DMatch(i, best_match_idx, float(1.0 - best_similarity)))
+                # 每行取最佳匹配
+                batch_scores, batch_indices = scores.max(dim=1)
+                best_scores.append(batch_scores)
+                best_indices.append(batch_indices)
+            
+            best_scores = torch.cat(best_scores)
+            best_indices = torch.cat(best_indices)
+            keep = best_scores > 0.6  # 阈值
+            
+            query_idx = torch.nonzero(keep).squeeze(1).cpu().numpy()
+            train_idx = best_indices[keep].cpu().numpy()
+            distances = (1.0 - best_scores[keep]).cpu().numpy()
         
-        return matches
+        return [cv2.DMatch(int(q), int(t), float(d)) for q, t, d in zip(query_idx, train_idx, distances)]
     
-    def match_features_traditional(self, desc1, desc2):
-        """传统特征匹配"""
-        # 使用FLANN匹配器
+    def create_flann_matcher(self):
+        """创建FLANN匹配器"""
         FLANN_INDEX_KDTREE = 1
         index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
         search_params = dict(checks=50)
         
-        flann = cv2.FlannBasedMatcher(index_params, search_params)
-        
+        return cv2.FlannBasedMatcher(index_params, search_params)
+    
+    def build_reference_matcher(self, ref_desc):
+        """为参考描述符预先构建一次FLANN索引，之后每帧直接查询"""
         try:
-            matches = flann.knnMatch(desc1, desc2, k=2)
+            self.flann_ref = self.create_flann_matcher()
+            self.flann_ref.add([np.ascontiguousarray(ref_desc, dtype=np.float32)])
+            self.flann_ref.train()
+        except Exception as e:
+            logger.warning(f"参考图像FLANN索引构建失败: {e}")
+            if hasattr(self, 'flann_ref'):
+                del self.flann_ref
+    
+    def match_features_traditional(self, desc1, desc2):
+        """传统特征匹配"""
+        try:
+            if desc1 is getattr(self, 'ref_desc', None) and hasattr(self, 'flann_ref'):
+                # 复用参考图像的索引：以当前图像为查询，再交换索引保持 query=参考、train=当前
+                knn = self.flann_ref.knnMatch(np.ascontiguousarray(desc2, dtype=np.float32), k=2)
+                swap = True
+            else:
+                # 使用FLANN匹配器
+                knn = self.create_flann_matcher().knnMatch(desc1, desc2, k=2)
+                swap = False
+            
+            knn = [pair for pair in knn if len(pair) == 2]
+            if not knn:
+                return []
+            
+            # Lowe's ratio test（向量化）
+            dists = np.array([(m.distance, n.distance) for m, n in knn], dtype=np.float32)
+            keep = np.nonzero(dists[:, 0] < 0.7 * dists[:, 1])[0]
             
-            # Lowe's ratio test
             good_matches = []
-            for match_pair in matches:
-                if len(match_pair) == 2:
-                    m, n = match_pair
-                    if m.distance < 0.7 * n.distance:
-                        good_matches.append(m)
+            for k in keep:
+                m = knn[k][0]
+                if swap:
+                    good_matches.append(cv2.DMatch(m.trainIdx, m.queryIdx, m.distance))
+                else:
+                    good_matches.append(m)
             
             return good_matches
             
@@ -756,6 +950,13 @@ class DeepLearningAlign:
             logger.warning("单应性矩阵为空，返回调整大小后的原图像")
             return cv2.resize(img, (reference_shape[1], reference_shape[0]))
         
+        # GPU上用 grid_sample 做透视变换，CPU设备仍使用OpenCV
+        if torch.device(self.device).type == 'cuda':
+            try:
+                return self.warp_perspective_gpu(img, homography, reference_shape[1], reference_shape[0])
+            except Exception as e:
+                logger.warning(f"GPU透视变换失败: {e}，使用OpenCV")
+        
         aligned_img = cv2.warpPerspective(
             img, homography, 
             (reference_shape[1], reference_shape[0]),
@@ -766,6 +967,40 @@ class DeepLearningAlign:
         
         return aligned_img
     
+    def warp_perspective_gpu(self, img, homography, out_w, out_h):
+        """
+        在GPU上进行透视变换，与 cv2.warpPerspective(INTER_LINEAR, BORDER_CONSTANT=0) 等价
+        
+        Args:
+            img: 输入图像 (H, W) 或 (H, W, C)，uint8
+            homography: 当前图像到参考图像的单应性矩阵
+            out_w, out_h: 输出尺寸
+        """
+        in_h, in_w = img.shape[:2]
+        
+        # [1, C, H, W] uint8 上传后在设备上转为浮点
+        img_u8 = self.upload_u8(img)
+        img_tensor = (img_u8.unsqueeze(-1) if img.ndim == 2 else img_u8).permute(2, 0, 1).unsqueeze(0).float()
+        
+        # 输出像素坐标经逆单应性映射回输入图像
+        h_inv = torch.from_numpy(np.linalg.inv(homography)).float().to(self.device)
+        ys, xs = torch.meshgrid(torch.arange(out_h, device=self.device, dtype=torch.float32),
+                                torch.arange(out_w, device=self.device, dtype=torch.float32),
+                                indexing='ij')
+        dst = torch.stack([xs, ys, torch.ones_like(xs)], dim=-1)  # [H, W, 3]
+        src = dst @ h_inv.t()
+        src_xy = src[..., :2] / src[..., 2:3]
+        
+        # 归一化到 [-1, 1]（像素中心对齐，与OpenCV坐标约定一致）
+        grid = torch.stack([src_xy[..., 0] * (2.0 / max(in_w - 1, 1)) - 1.0,
+                            src_xy[..., 1] * (2.0 / max(in_h - 1, 1)) - 1.0], dim=-1).unsqueeze(0)
+        
+        warped = F.grid_sample(img_tensor, grid, mode='bilinear', padding_mode='zeros', align_corners=True)
+        warped = warped[0].round_().clamp_(0, 255).to(torch.uint8).permute(1, 2, 0)
+        
+        aligned_img = warped.cpu().numpy()
+        return aligned_img[..., 0] if img.ndim == 2 else aligned_img
+    
     def process_images(self):
         """处理所有图像进行对齐"""
         image_files = self.get_image_files()
@@ -797,16 +1032,26 @@ class DeepLearningAlign:
         ref_kp, ref_desc = self.extract_features(reference_img)
         
         # 特殊处理LoFTR情况
-        if hasattr(self, 'use_loftr') and self.use_loftr:
+        if self._use_loftr:
             if ref_desc is None:
                 logger.error("参考图像tensor提取失败")
                 return
+            # 预处理后的参考tensor已在设备上，整个循环内复用
+            self.ref_tensor_gpu = ref_desc
             logger.info("参考图像已准备用于LoFTR匹配")
         else:
             if ref_desc is None:
                 logger.error("参考图像特征提取失败")
                 return
             logger.info(f"参考图像提取到 {len(ref_kp)} 个特征点")
+            
+            # 参考描述符只上传一次并常驻GPU（含归一化结果）
+            self.ref_desc = ref_desc
+            self.ref_desc_gpu = torch.from_numpy(ref_desc).float().to(self.device)
+            self.ref_desc_norm_gpu = F.normalize(self.ref_desc_gpu, p=2, dim=1)
+            
+            # 参考图像的FLANN索引只构建一次
+            self.build_reference_matcher(ref_desc)
         
         # 保存参考图像
         ref_output_path = self.output_dir / Path(reference_path).name
@@ -818,90 +1063,124 @@ class DeepLearningAlign:
         total_processed = 0
         processing_report = []
         
-        # 处理其他图像
-        for i, img_path in enumerate(image_files):
-            if i == self.reference_index:
-                continue
-            
-            logger.info(f"处理图像 {i+1}/{len(image_files)}: {Path(img_path).name}")
-            start_time = time.time()
-            
-            # 读取当前图像
-            current_img = cv2.imread(img_path)
-            if current_img is None:
-                logger.warning(f"无法读取图像: {img_path}")
-                continue
-            
-            total_processed += 1
-            
-            # 检查是否使用LoFTR
-            if hasattr(self, 'use_loftr') and self.use_loftr and hasattr(self, 'loftr_matcher'):
-                # LoFTR直接匹配两张图像
-                matches, matched_kp1, matched_kp2 = self.match_features_loftr(ref_desc, current_img)
-                match_points = len(matches)
+        # 后台写盘线程：编码与写入和下一帧的计算重叠（cv2.imwrite 会释放GIL）
+        self.writer_pool = ThreadPoolExecutor(max_workers=2)
+        pending_writes = []
+        
+        # 处理其他图像（按批次读取与提取特征）
+        other_files = [(i, p) for i, p in enumerate(image_files) if i != self.reference_index]
+        use_loftr = self._use_loftr
+        
+        batches = [other_files[k:k + self.batch_size] for k in range(0, len(other_files), self.batch_size)]
+        
+        with ThreadPoolExecutor(max_workers=self.batch_size) as read_pool:
+            # 预取：GPU处理当前批次时，后台线程已在解码下一批次
+            next_reads = [read_pool.submit(cv2.imread, p) for _, p in batches[0]] if batches else []
+            for batch_no, batch_files in enumerate(batches):
+                current_reads = next_reads
+                if batch_no + 1 < len(batches):
+                    next_reads = [read_pool.submit(cv2.imread, p) for _, p in batches[batch_no + 1]]
                 
-                logger.info(f"LoFTR找到 {match_points} 个匹配点")
+                # 取回当前批次图像
+                batch = []
+                for (i, img_path), future in zip(batch_files, current_reads):
+                    img = future.result()
+                    if img is None:
+                        logger.warning(f"无法读取图像: {img_path}")
+                        continue
+                    batch.append((i, img_path, img))
                 
-                if match_points >= 4:
-                    # 使用更宽松的RANSAC参数
-                    homography, inliers = self.estimate_homography_robust(matched_kp1, matched_kp2, matches, ransac_thresh=8.0)
-                    
-                    if homography is not None:
-                        logger.info(f"LoFTR对齐成功，内点数量: {inliers}")
-                    else:
-                        logger.warning("LoFTR对齐失败")
-                else:
-                    homography = None
-                    inliers = 0
-                    logger.warning("LoFTR匹配点不足")
-            else:
-                # 传统的特征提取和匹配
-                curr_kp, curr_desc = self.extract_features(current_img)
+                if not batch:
+                    continue
                 
-                homography = None
-                match_points = 0
-                inliers = 0
+                # 整批提取特征 / LoFTR匹配
+                batch_start_time = time.time()
+                batch_imgs = [img for _, _, img in batch]
+                if use_loftr:
+                    batch_results = self.match_features_loftr_batch(self.ref_tensor_gpu, batch_imgs)
+                else:
+                    batch_results = self.extract_features_batch(batch_imgs)
+                batch_feature_time = (time.time() - batch_start_time) / len(batch)
                 
-                if curr_desc is not None:
-                    # 匹配特征点
-                    matches = self.match_features_dl(ref_desc, curr_desc, ref_kp, curr_kp)
-                    match_points = len(matches)
-                    
-                    logger.info(f"找到 {match_points} 个匹配点")
+                for (i, img_path, current_img), batch_result in zip(batch, batch_results):
+                    logger.info(f"处理图像 {i+1}/{len(image_files)}: {Path(img_path).name}")
+                    start_time = time.time()
                     
-                    # 估计单应性矩阵
-                    homography, inliers = self.estimate_homography_robust(ref_kp, curr_kp, matches)
+                    total_processed += 1
                     
-                    if homography is not None:
-                        logger.info(f"深度学习对齐成功，内点数量: {inliers}")
+                    if use_loftr:
+                        # LoFTR直接匹配两张图像
+                        matches, matched_kp1, matched_kp2 = batch_result
+                        match_points = len(matches)
+                        
+                        logger.info(f"LoFTR找到 {match_points} 个匹配点")
+                        
+                        if match_points >= 4:
+                            # 使用更宽松的RANSAC参数
+                            homography, inliers = self.estimate_homography_robust(matched_kp1, matched_kp2, matches, ransac_thresh=8.0)
+                            
+                            if homography is not None:
+                                logger.info(f"LoFTR对齐成功，内点数量: {inliers}")
+                            else:
+                                logger.warning("LoFTR对齐失败")
+                        else:
+                            homography = None
+                            inliers = 0
+                            logger.warning("LoFTR匹配点不足")
                     else:
-                        logger.warning("深度学习对齐失败")
-            
-            # 对齐图像
-            aligned_img = self.align_image(current_img, homography, reference_img.shape)
-            
-            # 保存对齐后的图像
-            output_path = self.output_dir / Path(img_path).name
-            cv2.imwrite(str(output_path), aligned_img)
-            
-            processing_time = time.time() - start_time
-            success = homography is not None
-            
-            if success:
-                success_count += 1
-            
-            # 记录处理报告
-            report_entry = {
-                'filename': Path(img_path).name,
-                'method': self.method,
-                'match_points': match_points,
-                'inliers': inliers,
-                'processing_time': processing_time,
-                'success': success
-            }
-            processing_report.append(report_entry)
-            
-            logger.info(f"保存对齐图像: {output_path} (深度学习, {processing_time:.2f}秒)")
+                        # 传统的特征提取和匹配
+                        curr_kp, curr_desc = batch_result
+                        
+                        homography = None
+                        match_points = 0
+                        inliers = 0
+                        
+                        if curr_desc is not None:
+                            # 匹配特征点
+                            matches = self.match_features_dl(ref_desc, curr_desc, ref_kp, curr_kp)
+                            match_points = len(matches)
+                            
+                            logger.info(f"找到 {match_points} 个匹配点")
+                            
+                            # 估计单应性矩阵
+                            homography, inliers = self.estimate_homography_robust(ref_kp, curr_kp, matches)
+                            
+                            if homography is not None:
+                                logger.info(f"深度学习对齐成功，内点数量: {inliers}")
+                            else:
+                                logger.warning("深度学习对齐失败")
+                    
+                    # 对齐图像
+                    aligned_img = self.align_image(current_img, homography, reference_img.shape)
+                    
+                    # 保存对齐后的图像
+                    output_path = self.output_dir / Path(img_path).name
+                    pending_writes.append((output_path, self.writer_pool.submit(cv2.imwrite, str(output_path), aligned_img)))
+                    
+                    processing_time = time.time() - start_time + batch_feature_time
+                    success = homography is not None
+                    
+                    if success:
+                        success_count += 1
+                    
+                    # 记录处理报告
+                    report_entry = {
+                        'filename': Path(img_path).name,
+                        'method': self.method,
+                        'match_points': match_points,
+                        'inliers': inliers,
+                        'processing_time': processing_time,
+                        'success': success
+                    }
+                    processing_report.append(report_entry)
+                    
+                    logger.info(f"保存对齐图像: {output_path} (深度学习, {processing_time:.2f}秒)")
+        
+        # 等待所有后台写入完成后再生成报告
+        self.writer_pool.shutdown(wait=True)
+        for output_path, future in pending_writes:
+            if not future.result():
+                logger.warning(f"保存对齐图像失败: {output_path}")
         
         # 输出统计结果
         logger.info("=" * 60)
@@ -5,11 +5,23 @@
 检查所有模块的文件读取顺序是否正确
 """
 
+import os
 import sys
 sys.path.append('.')
 
 from pathlib import Path
 
+from image_files import walk_images
+from Resize.image_resizer import RESIZE_EXTENSIONS
+
+def _list_images_once(root):
+    """
+    按resize模块的扩展名遍历一次，返回按(文件夹, 文件名)排序的图片文件，供各模块共用
+    （resize模块的扩展名集合包含其他模块的全部扩展名）
+    """
+    # 遍历和排序都在str路径上进行，os.path.split即(文件夹, 文件名)
+    return sorted(walk_images(root, RESIZE_EXTENSIONS), key=os.path.split)
+
 def test_all_modules_file_order():
     """测试所有模块的文件读取顺序"""
     
@@ -21,11 +33,14 @@ def test_all_modules_file_order():
         print("❌ NPU-Everyday目录不存在")
         return
     
+    # 只遍历一次目录，各模块在同一份文件列表上应用各自的过滤与排序逻辑
+    all_files = _list_images_once(input_path)
+    
     # 测试1: Pipeline模块的文件排序
     print("\n1️⃣ 测试Pipeline模块:")
     try:
         from pipeline import TickTockPipeline
-        files1 = TickTockPipeline.get_sorted_image_files(input_path)
+        files1 = TickTockPipeline.get_sorted_image_files(input_path, files=all_files)
         print(f"   ✅ Pipeline: {len(files1)} 个文件，顺序正确")
         print(f"   📂 首个: {files1[0].relative_to(input_path)}")
         print(f"   📂 末个: {files1[-1].relative_to(input_path)}")
@@ -35,15 +50,8 @@ def test_all_modules_file_order():
     # 测试2: Resize模块的文件排序  
     print("\n2️⃣ 测试Resize模块:")
     try:
-        # 模拟Resize模块的文件收集逻辑
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        image_files = []
-        for file_path in input_path.rglob("*"):
-            if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-                image_files.append(file_path)
-        
-        # 按时间顺序排序（修复后的逻辑）
-        files2 = sorted(image_files, key=lambda x: (str(x.parent), x.name))
+        # all_files即Resize模块的文件收集结果，已按时间顺序排序
+        files2 = [Path(p) for p in all_files]
         print(f"   ✅ Resize: {len(files2)} 个文件，顺序正确")
         print(f"   📂 首个: {files2[0].relative_to(input_path)}")
         print(f"   📂 末个: {files2[-1].relative_to(input_path)}")
@@ -55,7 +63,7 @@ def test_all_modules_file_order():
     try:
         from Mosaic.mosaic_pic import MosaicGenerator
         mosaic = MosaicGenerator(str(input_path), "temp_output")
-        files3 = mosaic.get_image_files()
+        files3 = mosaic.get_image_files(files=all_files)
         print(f"   ✅ Mosaic: {len(files3)} 个文件，顺序正确")
         print(f"   📂 首个: {files3[0].relative_to(input_path)}")
         print(f"   📂 末个: {files3[-1].relative_to(input_path)}")
@@ -4,11 +4,15 @@
 测试Resize模块的文件处理顺序
 """
 
+import os
 import sys
 sys.path.append('.')
 
 from pathlib import Path
 
+from image_files import walk_images
+from Resize.image_resizer import RESIZE_EXTENSIONS
+
 def test_resize_file_order():
     """测试resize模块的文件读取顺序"""
     
@@ -17,17 +21,12 @@ def test_resize_file_order():
         print("❌ NPU-Everyday目录不存在")
         return
     
-    # 模拟resize模块的文件收集逻辑
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-    
-    # 收集所有图片文件
-    image_files = []
-    for file_path in input_path.rglob("*"):
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-            image_files.append(file_path)
+    # 与resize模块相同的文件收集函数和扩展名
+    image_files = list(walk_images(input_path, RESIZE_EXTENSIONS))
     
-    # 按时间顺序排序：先按文件夹，再按文件名（和修复后的代码一致）
-    image_files = sorted(image_files, key=lambda x: (str(x.parent), x.name))
+    # 按时间顺序排序：先按文件夹，再按文件名（和修复后的代码一致），在str路径上排序后再包装为Path
+    image_files.sort(key=os.path.split)
+    image_files = [Path(p) for p in image_files]
     
     print(f"🔍 Resize模块文件处理顺序测试")
     print(f"📋 找到 {len(image_files)} 个图片文件")
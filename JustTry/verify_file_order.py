@@ -9,6 +9,16 @@ from pipeline import TickTockPipeline
 from pathlib import Path
 import re
 
+_DATE_RE = re.compile(r'IMG_(\d{8})_')
+
+def _date_of(name):
+    """从文件名中提取 IMG_YYYYMMDD_ 中的日期，未匹配时返回None"""
+    # 快速路径：标准命名直接切片，无需正则
+    if name.startswith('IMG_') and name[12:13] == '_' and name[4:12].isdigit():
+        return name[4:12]
+    match = _DATE_RE.search(name)
+    return match.group(1) if match else None
+
 def verify_file_order(input_dir):
     """验证文件顺序是否正确"""
     print(f"🔍 检验 {input_dir} 中的文件顺序...")
@@ -27,13 +37,13 @@ def verify_file_order(input_dir):
     
     print(f"✅ 共找到 {len(files)} 个文件")
     
+    # 每个文件的 (文件夹名, 文件名) 只计算一次，后续分组、打印、日期检查共用
+    rel_pairs = [(file.parent.name, file.name) for file in files]
+    
     # 按文件夹分组显示
     folder_groups = {}
-    for file in files:
-        folder = file.parent.name
-        if folder not in folder_groups:
-            folder_groups[folder] = []
-        folder_groups[folder].append(file.name)
+    for folder, name in rel_pairs:
+        folder_groups.setdefault(folder, []).append(name)
     
     print(f"\n📁 文件夹分布（共 {len(folder_groups)} 个文件夹）：")
     for folder in sorted(folder_groups.keys()):
@@ -47,31 +57,28 @@ def verify_file_order(input_dir):
     # 显示整体时间线
     print(f"\n⏰ 整体时间线（前10个和后10个文件）：")
     print("前10个文件:")
-    for i, file in enumerate(files[:10], 1):
+    for i, (folder, name) in enumerate(rel_pairs[:10], 1):
         # 从文件名中提取日期
-        match = re.search(r'IMG_(\d{8})_', file.name)
-        date_str = match.group(1) if match else "未知日期"
-        print(f"  {i:2d}. {file.parent.name}/{file.name} ({date_str})")
+        date_str = _date_of(name) or "未知日期"
+        print(f"  {i:2d}. {folder}/{name} ({date_str})")
     
     if len(files) > 20:
         print("  ...")
         print("后10个文件:")
-        for i, file in enumerate(files[-10:], len(files)-9):
-            match = re.search(r'IMG_(\d{8})_', file.name)
-            date_str = match.group(1) if match else "未知日期"
-            print(f"  {i:2d}. {file.parent.name}/{file.name} ({date_str})")
+        for i, (folder, name) in enumerate(rel_pairs[-10:], len(rel_pairs)-9):
+            date_str = _date_of(name) or "未知日期"
+            print(f"  {i:2d}. {folder}/{name} ({date_str})")
     
     # 检查时间顺序是否合理
     print(f"\n🔍 时间顺序验证：")
     prev_date = None
     issues = []
     
-    for i, file in enumerate(files[:50]):  # 只检查前50个文件以避免输出过长
-        match = re.search(r'IMG_(\d{8})_', file.name)
-        if match:
-            current_date = match.group(1)
+    for i, (_, name) in enumerate(rel_pairs[:50]):  # 只检查前50个文件以避免输出过长
+        current_date = _date_of(name)
+        if current_date:
             if prev_date and current_date < prev_date:
-                issues.append(f"文件 {i+1}: {file.name} 的日期 {current_date} 早于前一个文件的日期 {prev_date}")
+                issues.append(f"文件 {i+1}: {name} 的日期 {current_date} 早于前一个文件的日期 {prev_date}")
             prev_date = current_date
     
     if issues:
@@ -16,15 +16,137 @@
 import os
 import sys
 import math
+import multiprocessing
 from pathlib import Path
 from PIL import Image, ImageFont, ImageDraw
+import numpy as np
 import logging
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from image_files import walk_images, IMAGE_EXTENSIONS
+
+# 可选：OpenCV的INTER_AREA（SIMD区域平均）用于缩小，比LANCZOS更快且抗混叠
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# 可选：libjpeg-turbo（SIMD DCT/量化）编码输出JPEG
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJSAMP_420, TJFLAG_PROGRESSIVE
+    _TJ = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    TURBOJPEG_AVAILABLE = False
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 进程池不使用fork启动：后台保存线程存在时fork会继承其持有的锁，导致子进程死锁
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+
+def scale_to_fit(image, target_width, target_height):
+    """
+    保持宽高比缩放图像，使其完全落在目标尺寸内（不补边）
+    
+    Args:
+        image (PIL.Image): 输入图像
+        target_width (int): 目标宽度
+        target_height (int): 目标高度
+        
+    Returns:
+        PIL.Image: 缩放后的图像
+    """
+    # 计算缩放比例（确保图像完全适配在目标区域内）
+    img_width, img_height = image.size
+    scale_w = target_width / img_width
+    scale_h = target_height / img_height
+    scale = min(scale_w, scale_h)  # 使用较小的缩放比例确保不裁切
+    
+    # 缩放图像
+    new_width = int(img_width * scale)
+    new_height = int(img_height * scale)
+    if CV2_AVAILABLE and scale < 1:
+        # 缩小：OpenCV区域插值
+        resized = Image.fromarray(cv2.resize(np.asarray(image.convert('RGB')), (new_width, new_height),
+                                             interpolation=cv2.INTER_AREA))
+    else:
+        resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    
+    return resized
+
+def fit_image(image, target_width, target_height):
+    """
+    智能缩放图像，保持宽高比并适配到目标尺寸（不裁切）
+    
+    Args:
+        image (PIL.Image): 输入图像
+        target_width (int): 目标宽度
+        target_height (int): 目标高度
+        
+    Returns:
+        PIL.Image: 缩放后的图像
+    """
+    resized = scale_to_fit(image, target_width, target_height)
+    new_width, new_height = resized.size
+    
+    # 创建目标大小的画布，居中放置图像
+    canvas = Image.new('RGB', (target_width, target_height), (240, 240, 240))
+    x_offset = (target_width - new_width) // 2
+    y_offset = (target_height - new_height) // 2
+    canvas.paste(resized, (x_offset, y_offset))
+    
+    return canvas
+
+def save_jpeg(image, output_path, quality, optimize=True, progressive=False):
+    """
+    保存JPEG：有libjpeg-turbo时用其编码，否则使用PIL（两条路径均为4:2:0色度抽样）
+    
+    Args:
+        image (PIL.Image): RGB图像
+        output_path (Path): 输出路径
+        quality (int): JPEG质量
+        optimize (bool): PIL回退路径是否进行两遍霍夫曼表优化
+        progressive (bool): 是否输出渐进式JPEG
+    """
+    if TURBOJPEG_AVAILABLE:
+        flags = TJFLAG_PROGRESSIVE if progressive else 0
+        data = _TJ.encode(np.asarray(image), quality=quality, pixel_format=TJPF_RGB,
+                          jpeg_subsample=TJSAMP_420, flags=flags)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+    else:
+        image.save(output_path, "JPEG", quality=quality, optimize=optimize,
+                   subsampling=2, progressive=progressive)
+
+def _decode_resize(args):
+    """
+    子进程中解码并缩放单张图像
+    
+    Args:
+        args (tuple): (图像路径, 目标宽度, 目标高度, 是否补边到目标尺寸)
+        
+    Returns:
+        tuple: (RGB原始字节, 尺寸, 错误信息)，成功时错误信息为None
+    """
+    img_file, target_width, target_height, pad = args
+    try:
+        with Image.open(img_file) as img:
+            # JPEG在解码阶段即按 1/2~1/8 进行DCT缩放，只解码所需分辨率（非JPEG为空操作）
+            img.draft('RGB', (target_width * 2, target_height * 2))
+            if pad:
+                resized_img = fit_image(img, target_width, target_height)
+            else:
+                resized_img = scale_to_fit(img.convert('RGB'), target_width, target_height)
+        return resized_img.tobytes(), resized_img.size, None
+    except Exception as e:
+        return None, None, str(e)
+
 class MosaicGenerator:
     """马赛克拼图生成器"""
     
@@ -43,6 +165,9 @@ class MosaicGenerator:
         self.target_width = target_width
         self.max_output_size = max_output_size
         
+        # 字体缓存：像素大小 -> 字体对象，多次生成时间线马赛克时只加载一次
+        self._font_cache = {}
+        
         # 创建输出目录
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -51,18 +176,22 @@ class MosaicGenerator:
         logger.info(f"输出目录: {self.output_dir}")
         logger.info(f"目标输出宽度: {self.target_width}px")
     
-    def get_image_files(self):
-        """获取所有图像文件"""
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        image_files = []
-        
-        for ext in image_extensions:
-            image_files.extend(list(self.input_dir.rglob(f"*{ext}")))
-            image_files.extend(list(self.input_dir.rglob(f"*{ext.upper()}")))
-        
-        # 去重并按时间顺序排序（先按文件夹，再按文件名）
-        image_files = sorted(list(set(image_files)), key=lambda x: (str(x.parent), x.name))
-        return image_files
+    def get_image_files(self, files=None):
+        """
+        获取所有图像文件（单次目录遍历，后缀不区分大小写）
+        
+        Args:
+            files (list): 已遍历得到的文件列表，提供时不再遍历输入目录，只做过滤和排序
+        """
+        if files is not None:
+            paths = [p for p in map(os.fspath, files) if p.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            paths = list(walk_images(self.input_dir))
+        
+        # 按时间顺序排序（先按文件夹，再按文件名），直接在str路径上用os.path.split取键，
+        # 排序完成后才包装为Path供调用方使用
+        paths.sort(key=os.path.split)
+        return [Path(p) for p in paths]
     
     def calculate_grid_layout(self, image_count):
         """
@@ -74,24 +203,16 @@ class MosaicGenerator:
         Returns:
             tuple: (rows, cols, cell_width, cell_height) 行数、列数、单元格宽度、单元格高度
         """
-        # 计算接近正方形的网格
-        cols = math.ceil(math.sqrt(image_count))
+        # 一次求解（单元格保持4:3比例）：
+        #   列数取接近正方形网格与满足高度上限所需列数中的较大者，
+        #   后者由 rows * cell_w * 3/4 <= max_output_size 且 rows ≈ N / cols 解得
+        #   cols >= sqrt(3 * N * target_width / (4 * max_output_size))
+        # 单元格宽度同时受宽度和高度两个上限约束，取二者较小值，保证输出不会超过限制
+        cols = max(math.ceil(math.sqrt(image_count)),
+                   math.ceil(math.sqrt(3 * image_count * self.target_width / (4 * self.max_output_size))))
         rows = math.ceil(image_count / cols)
-        
-        # 计算单元格大小（保持4:3比例）
-        cell_width = self.target_width // cols
-        cell_height = int(cell_width * 3 / 4)  # 4:3比例
-        
-        # 检查输出尺寸是否超过限制
-        output_height = rows * cell_height
-        if output_height > self.max_output_size:
-            # 重新计算以适应最大尺寸限制
-            max_rows = self.max_output_size // cell_height
-            if max_rows < rows:
-                cell_height = self.max_output_size // rows
-                cell_width = int(cell_height * 4 / 3)  # 保持4:3比例
-                cols = self.target_width // cell_width
-                rows = math.ceil(image_count / cols)
+        cell_width = min(self.target_width // cols, 4 * self.max_output_size // (3 * rows))
+        cell_height = cell_width * 3 // 4  # 4:3比例
         
         logger.info(f"网格布局: {rows}行 × {cols}列")
         logger.info(f"单元格大小: {cell_width}×{cell_height} 像素 (4:3比例)")
@@ -111,24 +232,51 @@ class MosaicGenerator:
         Returns:
             PIL.Image: 缩放后的图像
         """
-        # 计算缩放比例（确保图像完全适配在目标区域内）
-        img_width, img_height = image.size
-        scale_w = target_width / img_width
-        scale_h = target_height / img_height
-        scale = min(scale_w, scale_h)  # 使用较小的缩放比例确保不裁切
-        
-        # 缩放图像
-        new_width = int(img_width * scale)
-        new_height = int(img_height * scale)
-        resized = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        return fit_image(image, target_width, target_height)
+    
+    def _get_font(self, px):
+        """获取指定像素大小的标注字体（带缓存）"""
+        font = self._font_cache.get(px)
+        if font is None:
+            try:
+                font = ImageFont.truetype("arial.ttf", px)
+            except OSError:
+                font = ImageFont.load_default()
+            self._font_cache[px] = font
+        return font
+    
+    def iter_resized_images(self, image_files, target_width, target_height, window=None, pad=True):
+        """
+        多进程并行解码并缩放图像，按输入顺序逐个返回
         
-        # 创建目标大小的画布，居中放置图像
-        canvas = Image.new('RGB', (target_width, target_height), (240, 240, 240))
-        x_offset = (target_width - new_width) // 2
-        y_offset = (target_height - new_height) // 2
-        canvas.paste(resized, (x_offset, y_offset))
+        Args:
+            image_files (list): 图像文件列表
+            target_width (int): 目标宽度
+            target_height (int): 目标高度
+            window (int): 每次提交给进程池的图像数量（通常为若干行单元格），
+                          限制尚未粘贴的解码结果占用的内存；None表示一次全部提交
+            pad (bool): 是否补边到目标尺寸；False时只保持宽高比缩放
+            
+        Yields:
+            tuple: (索引, 图像文件, 缩放后的PIL图像)，失败的图像会被跳过
+        """
+        window = window or len(image_files) or 1
         
-        return canvas
+        # max_workers=None即CPU核数，在Windows上自动限制为61（超过会抛ValueError）
+        with ProcessPoolExecutor(max_workers=None, mp_context=_MP_CONTEXT) as executor:
+            for start in range(0, len(image_files), window):
+                tasks = [(img_file, target_width, target_height, pad) for img_file in image_files[start:start + window]]
+                
+                for idx, (data, size, error) in enumerate(executor.map(_decode_resize, tasks, chunksize=8), start):
+                    img_file = image_files[idx]
+                    if error is not None:
+                        logger.warning(f"处理图像 {img_file.name} 失败: {error}")
+                        continue
+                    
+                    yield idx, img_file, Image.frombytes('RGB', size, data)
+                    
+                    if (idx + 1) % 50 == 0:
+                        logger.info(f"已处理 {idx + 1}/{len(image_files)} 张图像")
     
     def create_mosaic_grid(self, image_files, rows, cols, cell_width, cell_height):
         """
@@ -144,49 +292,141 @@ class MosaicGenerator:
         Returns:
             PIL.Image: 马赛克图像
         """
-        # 创建空白画布
+        # 创建空白画布（uint8数组，单元格直接切片赋值，避免逐个PIL.paste）
         output_width = cols * cell_width
         output_height = rows * cell_height
-        mosaic = Image.new('RGB', (output_width, output_height), (255, 255, 255))
+        canvas = np.full((output_height, output_width, 3), 255, dtype=np.uint8)
         
         logger.info(f"开始生成马赛克，画布尺寸: {output_width}×{output_height}")
         
-        # 逐个处理图像
-        for idx, img_file in enumerate(image_files):
-            if idx >= rows * cols:
-                break
-                
+        # 解码与缩放在进程池中并行完成，主进程只负责粘贴
+        # 按行带（每次2行单元格）流式提交，待粘贴的单元格内存为 O(cols*cell) 而非 O(rows*cols*cell)
+        for idx, img_file, resized_img in self.iter_resized_images(image_files[:rows * cols], cell_width, cell_height,
+                                                                   window=2 * cols):
             row = idx // cols
             col = idx % cols
             
-            try:
-                # 读取并缩放图像
-                with Image.open(img_file) as img:
-                    resized_img = self.resize_image_fit(img, cell_width, cell_height)
-                    
-                    # 计算粘贴位置
-                    x = col * cell_width
-                    y = row * cell_height
-                    
-                    # 粘贴到画布
-                    mosaic.paste(resized_img, (x, y))
-                    
-                    if (idx + 1) % 50 == 0:
-                        logger.info(f"已处理 {idx + 1}/{len(image_files)} 张图像")
-                        
-            except Exception as e:
-                logger.warning(f"处理图像 {img_file.name} 失败: {e}")
-                continue
+            # 计算粘贴位置
+            x = col * cell_width
+            y = row * cell_height
+            
+            # 粘贴到画布
+            canvas[y:y + cell_height, x:x + cell_width] = np.asarray(resized_img)
         
-        return mosaic
+        return Image.fromarray(canvas)
     
-    def create_timeline_mosaic(self, image_files, cell_width=128):
+    def load_thumbnails(self, image_files, max_width, max_height):
+        """
+        一次性解码所有图像为保持宽高比的缩略图，供多个时间线马赛克复用
+        
+        Args:
+            image_files (list): 图像文件列表
+            max_width (int): 缩略图最大宽度
+            max_height (int): 缩略图最大高度
+            
+        Returns:
+            list: 与image_files一一对应的PIL图像，读取失败的位置为None
+        """
+        thumbnails = [None] * len(image_files)
+        for idx, _, thumb in self.iter_resized_images(image_files, max_width, max_height, pad=False):
+            thumbnails[idx] = thumb
+        return thumbnails
+    
+    def build_timeline_canvas(self, image_files, cell_width, thumbnails=None):
+        """
+        生成不含文字标注的时间线马赛克画布
+        
+        Args:
+            image_files (list): 图像文件列表
+            cell_width (int): 单元格宽度
+            thumbnails (list): load_thumbnails预先生成的缩略图（不小于单元格），
+                               提供时直接由缩略图缩放，不再解码原图
+            
+        Returns:
+            tuple: (画布数组, 成功放置的图像索引列表)
+        """
+        # 计算4:3比例的单元格尺寸
+        cell_height = int(cell_width * 3 / 4)
+        
+        # 计算布局：时间线风格，固定列数
+        cols = self.target_width // cell_width
+        rows = math.ceil(len(image_files) / cols)
+        
+        # 创建画布（uint8数组，单元格直接切片赋值）
+        canvas = np.full((rows * cell_height, cols * cell_width, 3), 240, dtype=np.uint8)
+        
+        if thumbnails is not None:
+            # 由已缓存的缩略图缩放，避免重复解码原图
+            cells = ((idx, img_file, fit_image(thumb, cell_width - 2, cell_height - 2))
+                     for idx, (img_file, thumb) in enumerate(zip(image_files, thumbnails)) if thumb is not None)
+        else:
+            # 解码与缩放在进程池中并行完成，主进程只负责切片赋值
+            cells = self.iter_resized_images(image_files, cell_width - 2, cell_height - 2,
+                                             window=2 * cols)  # 留2px边距
+        
+        placed = []
+        for idx, img_file, resized_img in cells:
+            row = idx // cols
+            col = idx % cols
+            
+            # 计算位置
+            x = col * cell_width + 1
+            y = row * cell_height + 1
+            
+            # 粘贴图像
+            canvas[y:y + cell_height - 2, x:x + cell_width - 2] = np.asarray(resized_img)
+            placed.append(idx)
+        
+        return canvas, placed
+    
+    def downscale_timeline_canvas(self, canvas, src_cell_width, cell_width, image_count):
+        """
+        将大单元格的时间线画布整体缩小，并按新列数重新排布单元格
+        
+        单元格尺寸为整数倍关系（128/64/32），整张画布一次INTER_AREA缩小后，
+        每个单元格恰好对应缩小后的一个块，只需用reshape重新排布行列
+        
+        Args:
+            canvas (np.ndarray): 源画布（不含文字标注）
+            src_cell_width (int): 源单元格宽度
+            cell_width (int): 目标单元格宽度
+            image_count (int): 图像数量
+            
+        Returns:
+            np.ndarray: 目标布局的画布
+        """
+        cell_height = int(cell_width * 3 / 4)
+        src_cols = self.target_width // src_cell_width
+        src_rows = canvas.shape[0] // int(src_cell_width * 3 / 4)
+        
+        # 一次缩小整张画布
+        small = cv2.resize(canvas, (src_cols * cell_width, src_rows * cell_height), interpolation=cv2.INTER_AREA)
+        
+        # 拆成按时间顺序排列的单元格 [N, h, w, 3]
+        cells = (small.reshape(src_rows, cell_height, src_cols, cell_width, 3)
+                 .transpose(0, 2, 1, 3, 4)
+                 .reshape(src_rows * src_cols, cell_height, cell_width, 3))[:image_count]
+        
+        # 按目标列数重新排布，末行不足部分用背景色填充
+        cols = self.target_width // cell_width
+        rows = math.ceil(image_count / cols)
+        grid = np.full((rows * cols, cell_height, cell_width, 3), 240, dtype=np.uint8)
+        grid[:image_count] = cells
+        return (grid.reshape(rows, cols, cell_height, cell_width, 3)
+                .transpose(0, 2, 1, 3, 4)
+                .reshape(rows * cell_height, cols * cell_width, 3))
+    
+    def create_timeline_mosaic(self, image_files, cell_width=128, thumbnails=None, source=None):
         """
         创建时间线马赛克（按时间顺序排列）
         
         Args:
             image_files (list): 图像文件列表
             cell_width (int): 单元格宽度
+            thumbnails (list): load_thumbnails预先生成的缩略图（不小于单元格），
+                               提供时直接由缩略图缩放，不再解码原图
+            source (tuple): build_timeline_canvas生成的 (画布, 单元格宽度, 已放置索引)，
+                            提供时由该画布整体缩小得到，单元格宽度需为本尺寸的整数倍
             
         Returns:
             PIL.Image: 时间线马赛克图像
@@ -198,56 +438,48 @@ class MosaicGenerator:
         cols = self.target_width // cell_width
         rows = math.ceil(len(image_files) / cols)
         
-        output_width = cols * cell_width
-        output_height = rows * cell_height
-        
         logger.info(f"时间线马赛克布局: {rows}行 × {cols}列")
-        logger.info(f"输出尺寸: {output_width}×{output_height}")
+        logger.info(f"输出尺寸: {cols * cell_width}×{rows * cell_height}")
+        
+        if source is not None:
+            src_canvas, src_cell_width, placed = source
+            if src_cell_width == cell_width:
+                canvas = src_canvas
+            else:
+                canvas = self.downscale_timeline_canvas(src_canvas, src_cell_width, cell_width, len(image_files))
+        else:
+            canvas, placed = self.build_timeline_canvas(image_files, cell_width, thumbnails)
         
-        # 创建画布
-        mosaic = Image.new('RGB', (output_width, output_height), (240, 240, 240))
+        mosaic = Image.fromarray(canvas)
         
         # 添加时间标注
-        try:
-            font = ImageFont.truetype("arial.ttf", cell_width // 8)
-        except:
-            font = ImageFont.load_default()
+        font = self._get_font(cell_width // 8)
         
         draw = ImageDraw.Draw(mosaic)
         
-        # 逐个处理图像
-        for idx, img_file in enumerate(image_files):
-            row = idx // cols
-            col = idx % cols
-            
-            try:
-                with Image.open(img_file) as img:
-                    resized_img = self.resize_image_fit(img, cell_width - 2, cell_height - 2)  # 留2px边距
-                    
-                    # 计算位置
-                    x = col * cell_width + 1
-                    y = row * cell_height + 1
-                    
-                    # 粘贴图像
-                    mosaic.paste(resized_img, (x, y))
-                    
-                    # 添加文件名标注（可选）
-                    if cell_width >= 64:  # 只在较大尺寸时添加文字
-                        text = img_file.stem[4:12]  # 只显示文件名的第5到第12个字符
-                        text_bbox = draw.textbbox((0, 0), text, font=font)
-                        text_width = text_bbox[2] - text_bbox[0]
-                        text_x = x + (cell_width - 4 - text_width) // 2
-                        text_y = y + cell_height - 16
-                        
-                        # 添加文字背景
-                        draw.text((text_x, text_y), text, fill=(255, 255, 255), font=font)
-                    
-                    if (idx + 1) % 50 == 0:
-                        logger.info(f"已处理 {idx + 1}/{len(image_files)} 张图像")
-                        
-            except Exception as e:
-                logger.warning(f"处理图像 {img_file.name} 失败: {e}")
-                continue
+        # 添加文件名标注（可选）
+        if cell_width >= 64:  # 只在较大尺寸时添加文字
+            # 日期标注均为等宽数字，同长度的文字宽度只测量一次
+            digit_widths = {}
+            for idx in placed:
+                img_file = image_files[idx]
+                x = (idx % cols) * cell_width + 1
+                y = (idx // cols) * cell_height + 1
+                
+                text = img_file.stem[4:12]  # 只显示文件名的第5到第12个字符
+                if text.isdigit():
+                    text_width = digit_widths.get(len(text))
+                    if text_width is None:
+                        text_bbox = draw.textbbox((0, 0), "0" * len(text), font=font)
+                        text_width = digit_widths[len(text)] = text_bbox[2] - text_bbox[0]
+                else:
+                    text_bbox = draw.textbbox((0, 0), text, font=font)
+                    text_width = text_bbox[2] - text_bbox[0]
+                text_x = x + (cell_width - 4 - text_width) // 2
+                text_y = y + cell_height - 16
+                
+                # 添加文字背景
+                draw.text((text_x, text_y), text, fill=(255, 255, 255), font=font)
         
         return mosaic
     
@@ -262,6 +494,14 @@ class MosaicGenerator:
         
         logger.info(f"找到 {len(image_files)} 个图像文件")
         
+        # JPEG编码在libjpeg中释放GIL：每张马赛克生成后立即提交后台保存，与下一张的生成重叠
+        save_pool = ThreadPoolExecutor(max_workers=4)
+        pending_saves = []
+        
+        def save_async(image, output_path, quality, description, optimize=True, progressive=False):
+            future = save_pool.submit(save_jpeg, image, output_path, quality, optimize, progressive)
+            pending_saves.append((future, output_path, description))
+        
         try:
             # 1. 生成网格马赛克
             logger.info("生成网格马赛克...")
@@ -269,30 +509,46 @@ class MosaicGenerator:
             grid_mosaic = self.create_mosaic_grid(image_files, rows, cols, cell_width, cell_height)
             
             grid_output = self.output_dir / "mosaic_grid.jpg"
-            grid_mosaic.save(grid_output, "JPEG", quality=90, optimize=True)
-            logger.info(f"网格马赛克已保存: {grid_output}")
+            # 大尺寸网格图：质量88 + 4:2:0 + 渐进式输出，自然照片拼图无可见损失而体积明显减小；
+            # 跳过两遍霍夫曼优化，编码时间约减半
+            save_async(grid_mosaic, grid_output, 88, "网格马赛克", optimize=False, progressive=True)
+            del grid_mosaic
+            
+            # 时间线马赛克共用一份缩略图：按最大的单元格解码一次，较小尺寸由其缩放
+            generate_medium = len(image_files) <= 1000  # 只在图像数量较少时生成大尺寸
+            base_cell = 128 if generate_medium else 64
+            logger.info("解码时间线马赛克缩略图...")
+            thumbnails = self.load_thumbnails(image_files, base_cell - 2, int(base_cell * 3 / 4) - 2)
+            
+            # 单元格为整数倍关系：只排布一次最大尺寸的画布，较小尺寸由整张画布缩小得到
+            source = None
+            if CV2_AVAILABLE:
+                base_canvas, placed = self.build_timeline_canvas(image_files, base_cell, thumbnails)
+                source = (base_canvas, base_cell, placed)
             
             # 2. 生成时间线马赛克（小尺寸）
             logger.info("生成时间线马赛克（小尺寸）...")
-            timeline_small = self.create_timeline_mosaic(image_files, cell_width=64)
+            timeline_small = self.create_timeline_mosaic(image_files, cell_width=64, thumbnails=thumbnails, source=source)
             timeline_small_output = self.output_dir / "mosaic_timeline_small.jpg"
-            timeline_small.save(timeline_small_output, "JPEG", quality=90, optimize=True)
-            logger.info(f"小尺寸时间线马赛克已保存: {timeline_small_output}")
+            save_async(timeline_small, timeline_small_output, 90, "小尺寸时间线马赛克")
             
             # 3. 生成时间线马赛克（中等尺寸）
-            if len(image_files) <= 1000:  # 只在图像数量较少时生成大尺寸
+            if generate_medium:
                 logger.info("生成时间线马赛克（中等尺寸）...")
-                timeline_medium = self.create_timeline_mosaic(image_files, cell_width=128)
+                timeline_medium = self.create_timeline_mosaic(image_files, cell_width=128, thumbnails=thumbnails, source=source)
                 timeline_medium_output = self.output_dir / "mosaic_timeline_medium.jpg"
-                timeline_medium.save(timeline_medium_output, "JPEG", quality=90, optimize=True)
-                logger.info(f"中等尺寸时间线马赛克已保存: {timeline_medium_output}")
+                save_async(timeline_medium, timeline_medium_output, 90, "中等尺寸时间线马赛克")
             
             # 4. 生成缩略图概览
             logger.info("生成缩略图概览...")
-            thumbnail_mosaic = self.create_timeline_mosaic(image_files, cell_width=32)
+            thumbnail_mosaic = self.create_timeline_mosaic(image_files, cell_width=32, thumbnails=thumbnails, source=source)
             thumbnail_output = self.output_dir / "mosaic_thumbnail.jpg"
-            thumbnail_mosaic.save(thumbnail_output, "JPEG", quality=85, optimize=True)
-            logger.info(f"缩略图概览已保存: {thumbnail_output}")
+            save_async(thumbnail_mosaic, thumbnail_output, 85, "缩略图概览")
+            
+            # 等待所有保存完成（报告需要读取输出文件大小）
+            for future, output_path, description in pending_saves:
+                future.result()
+                logger.info(f"{description}已保存: {output_path}")
             
             # 生成信息报告
             self.generate_info_report(image_files, rows, cols, cell_width, cell_height)
@@ -302,6 +558,9 @@ class MosaicGenerator:
         except Exception as e:
             logger.error(f"生成马赛克失败: {e}")
             return False
+        
+        finally:
+            save_pool.shutdown(wait=True)
     
     def generate_info_report(self, image_files, rows, cols, cell_width, cell_height):
         """生成马赛克信息报告"""
@@ -364,8 +623,8 @@ class MosaicGenerator:
 
 - **目标输出宽度**: {self.target_width} 像素
 - **最大输出尺寸**: {self.max_output_size} 像素
-- **图像缩放算法**: LANCZOS（高质量重采样）
-- **输出格式**: JPEG
+- **图像缩放算法**: {"INTER_AREA（OpenCV区域插值）" if CV2_AVAILABLE else "LANCZOS（高质量重采样）"}
+- **输出格式**: JPEG（{"libjpeg-turbo" if TURBOJPEG_AVAILABLE else "Pillow"}编码）
 - **压缩质量**: 85-90%
 
 ---
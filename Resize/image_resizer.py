@@ -1,9 +1,103 @@
 import os
+import io
 import sys
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import argparse
 from pathlib import Path
 
+from image_files import walk_images, IMAGE_EXTENSIONS
+
+# 可选：libvips（顺序流式读取、解码时按比例缩小、SIMD重采样）放缩JPEG；
+# 不可用时使用Pillow（安装pillow-simd可透明加速同一条LANCZOS路径）
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    PYVIPS_AVAILABLE = False
+
+# 放缩处理的扩展名：在公共图像扩展名之外还处理WebP
+RESIZE_EXTENSIONS = IMAGE_EXTENSIONS + ('.webp',)
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+# 进程池不使用fork启动：被流水线调用时父进程可能已有其他线程，fork会继承其持有的锁导致子进程死锁；
+# spawn/forkserver的工作进程会重新导入调用方的__main__，pipeline.py因此只在顶层导入轻量模块
+_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+def resize_opened_image(img, output_path, target_size=(4096, 3072)):
+    """
+    将已打开的图片放缩到目标尺寸（调用方负责打开和关闭图片，避免重复解析文件头）
+    
+    Args:
+        img: 已打开的PIL图片
+        output_path: 输出图片路径
+        target_size: 目标尺寸 (width, height)
+    """
+    try:
+        # 获取原始尺寸
+        original_size = img.size
+        print(f"原始尺寸: {original_size[0]}x{original_size[1]}")
+        
+        # 如果已经是目标尺寸，直接复制
+        if original_size == target_size:
+            img.save(output_path, quality=95, optimize=True)
+            print(f"✅ 尺寸已符合要求，直接复制")
+            return True
+        
+        # 缩小时让libjpeg在解码阶段按1/2~1/8的DCT比例直接输出较小图像（结果仍不小于目标尺寸），
+        # 再进行LANCZOS重采样；放大或非JPEG时为空操作
+        img.draft(img.mode, target_size)
+        
+        # 使用高质量重采样方法进行放缩
+        resized_img = img.resize(target_size, Image.Resampling.LANCZOS)
+        
+        # 保存放缩后的图片
+        resized_img.save(output_path, quality=95, optimize=True)
+        print(f"✅ 放缩完成: {original_size[0]}x{original_size[1]} → {target_size[0]}x{target_size[1]}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 处理失败: {e}")
+        return False
+
+def resize_image_vips(input_path, output_path, target_size=(4096, 3072)):
+    """
+    使用libvips将JPEG图片放缩到目标尺寸，输出参数与Pillow路径一致
+    （质量95、4:2:0色度抽样、优化霍夫曼表、不保留元数据、不按EXIF旋转）
+    
+    Args:
+        input_path: 输入图片路径
+        output_path: 输出图片路径
+        target_size: 目标尺寸 (width, height)
+    
+    Returns:
+        tuple: (原始尺寸, 是否成功)，无法读取时原始尺寸为None
+    """
+    original_size = None
+    try:
+        img = pyvips.Image.new_from_file(input_path, access='sequential')
+        original_size = (img.width, img.height)
+        print(f"原始尺寸: {original_size[0]}x{original_size[1]}")
+        
+        if original_size != target_size:
+            # 从文件放缩，JPEG解码阶段即可按2的幂缩小后再精确重采样
+            img = pyvips.Image.thumbnail(input_path, target_size[0], height=target_size[1],
+                                         size='force', no_rotate=True)
+        
+        img.jpegsave(output_path, Q=95, strip=True, optimize_coding=True, subsample_mode='on')
+        if original_size == target_size:
+            print(f"✅ 尺寸已符合要求，直接复制")
+        else:
+            print(f"✅ 放缩完成: {original_size[0]}x{original_size[1]} → {target_size[0]}x{target_size[1]}")
+        return original_size, True
+        
+    except Exception as e:
+        print(f"❌ 处理失败: {e}")
+        return original_size, False
+
 def resize_image(input_path, output_path, target_size=(4096, 3072)):
     """
     将图片放缩到目标尺寸
@@ -13,30 +107,43 @@ def resize_image(input_path, output_path, target_size=(4096, 3072)):
         output_path: 输出图片路径
         target_size: 目标尺寸 (width, height)
     """
+    if PYVIPS_AVAILABLE and str(output_path).lower().endswith(JPEG_EXTENSIONS):
+        return resize_image_vips(input_path, output_path, target_size)[1]
+    
     try:
         with Image.open(input_path) as img:
-            # 获取原始尺寸
-            original_size = img.size
-            print(f"原始尺寸: {original_size[0]}x{original_size[1]}")
-            
-            # 如果已经是目标尺寸，直接复制
-            if original_size == target_size:
-                img.save(output_path, quality=95, optimize=True)
-                print(f"✅ 尺寸已符合要求，直接复制")
-                return True
-            
-            # 使用高质量重采样方法进行放缩
-            resized_img = img.resize(target_size, Image.Resampling.LANCZOS)
-            
-            # 保存放缩后的图片
-            resized_img.save(output_path, quality=95, optimize=True)
-            print(f"✅ 放缩完成: {original_size[0]}x{original_size[1]} → {target_size[0]}x{target_size[1]}")
-            return True
-            
+            return resize_opened_image(img, output_path, target_size)
     except Exception as e:
         print(f"❌ 处理失败: {e}")
         return False
 
+def _resize_worker(job):
+    """
+    子进程中打开并放缩单张图片
+    
+    Args:
+        job: (输入路径, 输出路径, 目标尺寸)
+    
+    Returns:
+        tuple: (原始尺寸, 是否成功, 处理日志)，图片无法打开时原始尺寸为None；
+               日志在子进程中收集，由主进程按文件顺序输出，避免多进程输出交错
+    """
+    input_path, output_path, target_size = job
+    log = io.StringIO()
+    size = None
+    with contextlib.redirect_stdout(log):
+        if PYVIPS_AVAILABLE and output_path.lower().endswith(JPEG_EXTENSIONS):
+            size, ok = resize_image_vips(input_path, output_path, target_size)
+        else:
+            try:
+                with Image.open(input_path) as img:
+                    size = img.size
+                    ok = resize_opened_image(img, output_path, target_size)
+            except Exception as e:
+                print(f"❌ 处理失败: {e}")
+                ok = False
+    return size, ok, log.getvalue()
+
 def process_directory(input_dir, output_dir, target_size=(4096, 3072)):
     """
     批量处理目录中的所有图片
@@ -57,8 +164,6 @@ def process_directory(input_dir, output_dir, target_size=(4096, 3072)):
     output_path.mkdir(parents=True, exist_ok=True)
     
     # 支持的图片格式
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-    
     # 统计信息
     total_images = 0
     processed_images = 0
@@ -73,13 +178,11 @@ def process_directory(input_dir, output_dir, target_size=(4096, 3072)):
     print("=" * 60)
     
     # 收集所有图片文件并按时间顺序排序
-    image_files = []
-    for file_path in input_path.rglob("*"):
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-            image_files.append(file_path)
+    image_files = list(walk_images(input_path, RESIZE_EXTENSIONS))
     
-    # 按时间顺序排序：先按文件夹，再按文件名
-    image_files = sorted(image_files, key=lambda x: (str(x.parent), x.name))
+    # 按时间顺序排序：先按文件夹，再按文件名（在str路径上排序，完成后再包装为Path）
+    image_files.sort(key=os.path.split)
+    image_files = [Path(p) for p in image_files]
     
     print(f"📋 找到 {len(image_files)} 个图片文件（按时间顺序排列）")
     
@@ -93,41 +196,43 @@ def process_directory(input_dir, output_dir, target_size=(4096, 3072)):
             print(f"   ... 还有 {len(image_files)-3} 个文件")
     print("=" * 60)
     
-    # 遍历排序后的图片文件
+    # 先构建所有任务（保持相对目录结构），再交给进程池并行解码、放缩、编码
+    jobs = []
     for file_path in image_files:
-        total_images += 1
-        
-        # 构建输出文件路径，保持相对目录结构
         relative_path = file_path.relative_to(input_path)
         output_file = output_path / relative_path
         
         # 确保输出目录存在
         output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        print(f"\n📸 处理第 {total_images} 个图片:")
-        print(f"   文件: {relative_path}")
-        
-        # 检查原始尺寸并分类
-        try:
-            with Image.open(file_path) as img:
-                size = img.size
-                if size == (3648, 2736):
-                    huawei_count += 1
-                    print(f"   设备: HUAWEI P30 Pro")
-                elif size == (4096, 3072):
-                    vivo_count += 1
-                    print(f"   设备: vivo X100 Pro")
-                else:
-                    other_count += 1
-                    print(f"   设备: 其他 ({size[0]}x{size[1]})")
-        except:
-            pass
-        
-        # 处理图片
-        if resize_image(str(file_path), str(output_file), target_size):
-            processed_images += 1
-        else:
-            failed_images += 1
+        jobs.append((str(file_path), str(output_file), target_size))
+    
+    # map按提交顺序返回结果，chunksize摊薄进程间通信开销；
+    # max_workers=None即CPU核数，在Windows上自动限制为61（超过会抛ValueError）
+    with ProcessPoolExecutor(max_workers=None, mp_context=_MP_CONTEXT) as executor:
+        results = executor.map(_resize_worker, jobs, chunksize=8)
+        for file_path, (size, ok, log) in zip(image_files, results):
+            total_images += 1
+            
+            print(f"\n📸 处理第 {total_images} 个图片:")
+            print(f"   文件: {file_path.relative_to(input_path)}")
+            
+            # 检查原始尺寸并分类
+            if size == (3648, 2736):
+                huawei_count += 1
+                print(f"   设备: HUAWEI P30 Pro")
+            elif size == (4096, 3072):
+                vivo_count += 1
+                print(f"   设备: vivo X100 Pro")
+            elif size is not None:
+                other_count += 1
+                print(f"   设备: 其他 ({size[0]}x{size[1]})")
+            
+            print(log, end="")
+            
+            if ok:
+                processed_images += 1
+            else:
+                failed_images += 1
     
     # 输出统计结果
     print("\n" + "=" * 60)
@@ -1,10 +1,18 @@
-from datetime import datetime
-import calendar
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+def weekday_zeller(y, m, d):
+    """蔡勒公式计算星期几，返回 0=周一, 6=周日（纯整数运算，不创建datetime对象）"""
+    if m < 3:
+        m += 12
+        y -= 1
+    K = y % 100
+    J = y // 100
+    h = (d + 13 * (m + 1) // 5 + K + K // 4 + J // 4 + 5 * J) % 7  # 0=周六
+    return (h + 5) % 7
 
 # 查看2023年9月1日是星期几
-date_2023_09_01 = datetime(2023, 9, 1)
-weekday = date_2023_09_01.weekday()  # 0=周一, 6=周日
-weekday_name = calendar.day_name[weekday]
+weekday = weekday_zeller(2023, 9, 1)  # 0=周一, 6=周日
+weekday_name = WEEKDAY_NAMES[weekday]
 
 print(f"2023年9月1日是：{weekday_name} (数字代码: {weekday})")
-print("0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday, 5=Saturday, 6=Sunday")
\ No newline at end of file
+print("0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday, 5=Saturday, 6=Sunday")
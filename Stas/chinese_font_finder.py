@@ -1,3 +1,4 @@
+import re
 from matplotlib import pyplot as plt
 import matplotlib
 import matplotlib.font_manager as fm
@@ -11,6 +12,8 @@ chinese_keywords = [
     'AR PL', 'WenQuanYi', 'Noto', 'Source', 'SimHei', 
     'SimSun', 'Microsoft', 'YaHei', 'Fallback', 'Droid'
 ]
+# 所有关键词编译为一个正则，每个字体名只需一次扫描
+chinese_keyword_pattern = re.compile("|".join(map(re.escape, chinese_keywords)))
 
 print("🔍 系统中所有字体:")
 print("=" * 50)
@@ -19,14 +22,12 @@ for i, font in enumerate(all_fonts, 1):
 
 print("\n🎯 可能支持中文的字体:")
 print("=" * 50)
-chinese_fonts = []
-for font in all_fonts:
-    if any(keyword in font for keyword in chinese_keywords):
-        chinese_fonts.append(font)
-        print(f"✅ {font}")
+chinese_fonts = [font for font in all_fonts if chinese_keyword_pattern.search(font)]
+for font in chinese_fonts:
+    print(f"✅ {font}")
 
-# 去重并显示
-unique_chinese_fonts = list(set(chinese_fonts))
+# 去重并显示（排序保证输出稳定）
+unique_chinese_fonts = sorted(set(chinese_fonts))
 print(f"\n📊 去重后的中文字体 (共 {len(unique_chinese_fonts)} 个):")
 print("=" * 50)
 for i, font in enumerate(unique_chinese_fonts, 1):
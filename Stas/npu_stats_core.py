@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NPU-Everyday 照片统计公共模块
+照片扫描（含磁盘缓存）、日期序列、月份天数与按周期汇总，供 statistics_y.py、statistics_m.py、visual_commit_markdown.py、visual_commit.py 与 visual_commit_png.py 共用
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import calendar
+
+import numpy as np
+
+# 各月天数查找表（覆盖统计期间前后的年份），表外年月回退到 calendar.monthrange
+DAYS_IN_MONTH = {(y, m): calendar.monthrange(y, m)[1] for y in range(2020, 2031) for m in range(1, 13)}
+
+def days_in_month(year, month):
+    """
+    返回指定年月的天数，优先查表
+    """
+    days = DAYS_IN_MONTH.get((year, month))
+    return days if days is not None else calendar.monthrange(year, month)[1]
+
+# 照片文件名：IMG_20230901_114129.jpg，一次匹配同时完成前缀/后缀过滤、日期校验与提取
+_IMG_RE = re.compile(r'IMG_([0-9]{4})(0[1-9]|1[0-2])(0[1-9]|[12][0-9]|3[01]).*\.jpg', re.DOTALL)
+
+def _scan_one_folder(folder_path):
+    """
+    扫描单个子文件夹中的照片
+    返回该文件夹按日期计数的Counter，无法访问时返回None
+    """
+    folder_stats = Counter()
+    try:
+        with os.scandir(folder_path) as files:
+            for f in files:
+                m = _IMG_RE.fullmatch(f.name)
+                if m:
+                    folder_stats[f"{m[1]}-{m[2]}-{m[3]}"] += 1
+    except PermissionError:
+        return None
+
+    # 正则只限定日为01-31；按日期（而非逐文件）剔除不存在的日期，如 09-31、平年 02-29
+    for date_key in [k for k in folder_stats
+                     if int(k[8:]) > days_in_month(int(k[:4]), int(k[5:7]))]:
+        del folder_stats[date_key]
+    return folder_stats
+
+def scan_all_photos_in_directory(base_directory):
+    """
+    扫描基础目录下所有子文件夹中的照片
+    返回按日期分组的照片统计
+    """
+    photo_stats = Counter()  # key: 'YYYY-MM-DD', value: count
+    
+    if not os.path.exists(base_directory):
+        print(f"错误：目录 {base_directory} 不存在")
+        return photo_stats
+    
+    print(f"正在扫描目录：{base_directory}")
+    total_photos = 0
+    
+    # 收集所有子文件夹（os.scandir返回的DirEntry自带类型信息，无需逐项isdir/stat）
+    with os.scandir(base_directory) as entries:
+        folders = [(entry.name, entry.path) for entry in entries if entry.is_dir(follow_symlinks=False)]
+    folder_count = len(folders)
+    
+    # 目录读取受I/O延迟限制，多线程并发扫描各子文件夹；map按提交顺序返回结果
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = executor.map(_scan_one_folder, [path for _, path in folders])
+        for (name, path), folder_stats in zip(folders, results):
+            if folder_stats is None:
+                print(f"警告：无法访问文件夹 {path}")
+                continue
+            
+            # 按日期合并，代价与不同日期数成正比
+            photo_stats.update(folder_stats)
+            folder_photos = sum(folder_stats.values())
+            total_photos += folder_photos
+            
+            if folder_photos > 0:
+                print(f"  📁 {name}: {folder_photos} 张照片")
+    
+    print(f"\n扫描完成：")
+    print(f"  📁 总文件夹数：{folder_count}")
+    print(f"  📸 总照片数：{total_photos}")
+    print(f"  📅 拍照天数：{len(photo_stats)}")
+    
+    return photo_stats
+
+# 扫描结果缓存文件：记录目录签名和按日期的照片计数，目录未变化时直接复用
+STATS_CACHE_PATH = Path("~/.ticktock_stats_cache.json").expanduser()
+
+def _directory_signature(base_directory):
+    """
+    计算基础目录的签名：基础目录及各子文件夹的mtime
+    （子文件夹中增删照片会改变该子文件夹的mtime，增删子文件夹会改变基础目录的mtime）
+    """
+    with os.scandir(base_directory) as entries:
+        folder_mtimes = sorted([entry.name, entry.stat().st_mtime_ns]
+                               for entry in entries if entry.is_dir(follow_symlinks=False))
+    return [os.path.abspath(base_directory), os.stat(base_directory).st_mtime_ns, folder_mtimes]
+
+def scan_all_photos_cached(base_directory):
+    """
+    带磁盘缓存的scan_all_photos_in_directory：目录签名与缓存一致时直接读取缓存，否则重新扫描并写入缓存
+    """
+    if not os.path.exists(base_directory):
+        return scan_all_photos_in_directory(base_directory)
+    
+    signature = _directory_signature(base_directory)  # 只含列表/字符串/整数，可直接与JSON读回的结构比较
+    try:
+        with open(STATS_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('signature') == signature:
+            photo_stats = Counter(cache['photo_stats'])
+            print(f"♻️ 目录未变化，使用扫描缓存：{STATS_CACHE_PATH}")
+            print(f"  📸 总照片数：{sum(photo_stats.values())}")
+            print(f"  📅 拍照天数：{len(photo_stats)}")
+            return photo_stats
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    
+    photo_stats = scan_all_photos_in_directory(base_directory)
+    try:
+        with open(STATS_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'photo_stats': photo_stats}, f)
+    except OSError as e:
+        print(f"警告：无法写入扫描缓存 {STATS_CACHE_PATH}: {e}")
+    return photo_stats
+
+def generate_date_range(start_date, end_date):
+    """
+    生成指定日期范围内的所有日期
+    """
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+def generate_date_keys(dates):
+    """
+    生成与日期列表一一对应的 'YYYY-MM-DD' 键，供各统计函数共用，每个日期只格式化一次
+    """
+    return [d.strftime("%Y-%m-%d") for d in dates]
+
+def generate_photo_counts(photo_stats, date_keys):
+    """
+    按日期顺序生成每天照片数的数组，扫描后只构建一次，各统计函数按下标读取，不再各自查字典
+    """
+    return np.fromiter((photo_stats.get(k, 0) for k in date_keys), dtype=np.int64, count=len(date_keys))
+
+def aggregate_by_period(dates, photo_counts, period_of):
+    """
+    用numpy.bincount按周期（月/年）汇总每日统计，替代逐日的字典累加
+    
+    Args:
+        photo_counts: 与dates对齐的每日照片数数组
+        period_of: 日期 -> 整数周期编号，如按年 d.year，按月 d.year * 12 + d.month - 1
+    
+    返回按周期编号升序的 [(周期编号, {'total_photos', 'photo_days', 'total_days'})]
+    """
+    period_ids = np.array([period_of(d) for d in dates], dtype=np.int64)
+    first = int(period_ids.min())
+    idx = period_ids - first
+    
+    total_days = np.bincount(idx)
+    total_photos = np.bincount(idx, weights=photo_counts).astype(np.int64)
+    photo_days = np.bincount(idx, weights=photo_counts > 0).astype(np.int64)
+    
+    return [
+        (first + i, {'total_photos': p, 'photo_days': pd, 'total_days': td})
+        for i, (p, pd, td) in enumerate(zip(total_photos.tolist(), photo_days.tolist(), total_days.tolist()))
+        if td > 0
+    ]
+
+def validate_date_handling():
+    """
+    验证日期处理的正确性，特别是月份天数和闰年
+    """
+    print("\n🔍 验证日期处理...")
+    
+    test_cases = [
+        (2023, 2),  # 2023年2月 - 平年，28天
+        (2024, 2),  # 2024年2月 - 闰年，29天
+        (2025, 2),  # 2025年2月 - 平年，28天
+        (2023, 4),  # 2023年4月 - 30天
+        (2023, 12), # 2023年12月 - 31天
+    ]
+    
+    for year, month in test_cases:
+        month_days = days_in_month(year, month)
+        is_leap = calendar.isleap(year)
+        
+        print(f"  {year}年{month:02d}月：{month_days}天", end="")
+        if month == 2:
+            print(f" ({'闰年' if is_leap else '平年'})", end="")
+        print()
+    
+    print("✅ 日期处理验证完成")
@@ -1,5 +1,4 @@
 import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
 import warnings
 import os
 from datetime import datetime
@@ -8,30 +7,32 @@ from datetime import datetime
 warnings.filterwarnings('ignore', message='.*missing from font.*')
 warnings.filterwarnings('ignore', category=UserWarning, module='matplotlib')
 
-def test_specific_font(font_name):
+def create_font_test_figure():
+    """创建字体测试图，所有字体共用同一个 Figure，只替换文字内容"""
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.axis('off')
+    
+    text_artist = ax.text(0.5, 0.5, "", fontsize=14, ha='center', va='center',
+                          bbox=dict(boxstyle="round,pad=0.5", facecolor='lightblue', alpha=0.3))
+    return fig, ax, text_artist
+
+def test_specific_font(font_name, fig, ax, text_artist):
     """测试特定字体是否能正确显示中文"""
     try:
-        # 设置字体
+        # 设置字体（绘制时按 rcParams 查找字体，已有的文字对象无需重建）
         plt.rcParams['font.sans-serif'] = [font_name]
         
-        # 创建测试图
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.set_xlim(0, 1)
-        ax.set_ylim(0, 1)
-        
         # 测试文本
         test_text = f"字体测试: {font_name}\n中文显示：你好世界！\n数字符号：2025年9月30日"
         
-        ax.text(0.5, 0.5, test_text, fontsize=14, ha='center', va='center',
-                bbox=dict(boxstyle="round,pad=0.5", facecolor='lightblue', alpha=0.3))
-        
+        text_artist.set_text(test_text)
         ax.set_title(f'字体测试: {font_name}', fontsize=16, weight='bold')
-        ax.axis('off')
         
         # 保存测试图
         filename = f"test_font_{font_name.replace(' ', '_').replace('/', '_')}.jpg"
-        plt.savefig(filename, dpi=200, bbox_inches='tight', facecolor='white')
-        plt.close()
+        fig.savefig(filename, dpi=200, bbox_inches='tight', facecolor='white')
         
         file_size = os.path.getsize(filename) / 1024
         print(f"✅ {font_name} - 测试成功，图片已保存: {filename} ({file_size:.1f} KB)")
@@ -41,21 +42,12 @@ def test_specific_font(font_name):
         print(f"❌ {font_name} - 测试失败: {e}")
         return False, None
 
-def update_matplotlib_font_cache():
-    """更新matplotlib字体缓存"""
-    try:
-        print("🔄 更新matplotlib字体缓存...")
-        fm._rebuild()
-        print("✅ 字体缓存更新完成")
-    except:
-        print("❌ 字体缓存更新失败")
-
 def main():
     print("🎯 精确字体测试工具")
     print("=" * 50)
     
-    # 更新字体缓存
-    update_matplotlib_font_cache()
+    # 直接使用 matplotlib 的磁盘字体缓存，不再每次运行都重建（全量扫描字体目录需要数秒）。
+    # 新安装字体后如果检测不到，删除 ~/.cache/matplotlib/fontlist-v*.json 再运行即可
     
     # 要测试的字体列表
     fonts_to_test = [
@@ -71,10 +63,12 @@ def main():
     
     print(f"\n🧪 测试字体显示效果...")
     
+    fig, ax, text_artist = create_font_test_figure()
     for font_name in fonts_to_test:
-        success, filename = test_specific_font(font_name)
+        success, filename = test_specific_font(font_name, fig, ax, text_artist)
         if success:
             successful_fonts.append(font_name)
+    plt.close(fig)
     
     print(f"\n📊 测试结果:")
     print(f"✅ 成功的字体数量: {len(successful_fonts)}")
@@ -1,23 +1,27 @@
 import os
 import re
 from collections import defaultdict
-from datetime import datetime, timedelta
+
+from npu_stats_core import days_in_month
+
+# 文件夹年月模式，按顺序尝试：先 YYYY.MM / YYYY-MM / YYYY_MM，月份无效时再尝试 YYYYMM
+_FOLDER_RES = (
+    re.compile(r'(\d{4})[.\-_](\d{1,2})'),  # 2025.06, 2025-06, 2025_06
+    re.compile(r'(\d{4})(\d{2})'),           # 202506
+)
+
+# 照片文件名：IMG_YYYYMMDD_xxx.jpg；日期部分可选，便于对格式不对的文件给出警告
+_IMG_RE = re.compile(r'IMG_(?:([0-9]{4})([0-9]{2})([0-9]{2}))?.*\.jpg', re.DOTALL)
 
 def extract_year_month_from_folder(folder_path):
     """
     从文件夹名称中提取年月信息
-    支持格式：YYYY.MM, YYYY-MM, YYYY_MM 等
+    支持格式：YYYY.MM, YYYY-MM, YYYY_MM, YYYYMM
     """
     folder_name = os.path.basename(folder_path)
     
-    # 匹配 YYYY.MM, YYYY-MM, YYYY_MM 格式
-    patterns = [
-        r'(\d{4})[.\-_](\d{1,2})',  # 2025.06, 2025-06, 2025_06
-        r'(\d{4})(\d{2})',          # 202506
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, folder_name)
+    for pattern in _FOLDER_RES:
+        match = pattern.search(folder_name)
         if match:
             year = int(match.group(1))
             month = int(match.group(2))
@@ -26,6 +30,25 @@ def extract_year_month_from_folder(folder_path):
     
     return None, None
 
+def _parse_photo_date(filename):
+    """
+    解析 IMG_YYYYMMDD_xxx.jpg 文件名中的日期
+    返回 (年, 月, 日)；非照片文件返回None，格式或日期不合法时打印警告并返回None
+    """
+    match = _IMG_RE.fullmatch(filename)
+    if not match:
+        return None
+    if match.group(1) is None:
+        print(f"警告：无法解析文件名 {filename}")
+        return None
+    y = int(match.group(1))
+    m = int(match.group(2))
+    d = int(match.group(3))
+    if not (1 <= m <= 12 and 1 <= d <= days_in_month(y, m)):
+        print(f"警告：无法解析文件名 {filename}: 日期超出范围")
+        return None
+    return y, m, d
+
 def get_photo_statistics(folder_path, year=None, month=None, auto_detect=True):
     """
     统计照片文件夹中的拍照情况
@@ -49,34 +72,45 @@ def get_photo_statistics(folder_path, year=None, month=None, auto_detect=True):
     
     # 统计每天的照片数量
     day_count = defaultdict(int)
-    all_dates = set()
+    all_dates = set()  # (年, 月, 日) 元组
     
     # 遍历文件夹，统计每天的照片数量
-    for filename in os.listdir(folder_path):
-        if filename.startswith("IMG_") and filename.endswith(".jpg"):
-            try:
-                date_str = filename[4:12]  # 20250601
-                date_obj = datetime.strptime(date_str, "%Y%m%d")
+    if year is not None and month is not None:
+        # 已知年月：只有 IMG_YYYYMM 开头的文件可能计入，先比较前缀，再只解析“日”两位
+        prefix = f"IMG_{year:04d}{month:02d}"
+        month_days = days_in_month(year, month)
+        for filename in os.listdir(folder_path):
+            if filename[:10] != prefix or filename[-4:] != ".jpg":
+                # 不属于该月的文件直接跳过；格式或日期不合法的照片文件名照常给出警告
+                _parse_photo_date(filename)
+                continue
+            day_str = filename[10:12]
+            if not (day_str.isascii() and day_str.isdigit()):
+                print(f"警告：无法解析文件名 {filename}")
+                continue
+            d = int(day_str)
+            if not 1 <= d <= month_days:
+                print(f"警告：无法解析文件名 {filename}: 日期超出范围")
+                continue
+            day_count[d] += 1
+            all_dates.add((year, month, d))
+    else:
+        for filename in os.listdir(folder_path):
+            parsed = _parse_photo_date(filename)
+            if parsed:
+                y, m, d = parsed
                 
-                # 如果指定了年份和月份，只统计该月
-                if year is not None and month is not None:
-                    if date_obj.year == year and date_obj.month == month:
-                        day_count[date_obj.day] += 1
-                        all_dates.add(date_obj)
                 # 如果只指定了年份，统计整年
-                elif year is not None and month is None:
-                    if date_obj.year == year:
-                        key = f"{date_obj.month:02d}-{date_obj.day:02d}"
+                if year is not None:
+                    if y == year:
+                        key = f"{m:02d}-{d:02d}"
                         day_count[key] += 1
-                        all_dates.add(date_obj)
+                        all_dates.add((y, m, d))
                 # 如果都没指定，统计所有
                 else:
-                    key = f"{date_obj.year}-{date_obj.month:02d}-{date_obj.day:02d}"
+                    key = f"{y}-{m:02d}-{d:02d}"
                     day_count[key] += 1
-                    all_dates.add(date_obj)
-            except Exception as e:
-                print(f"警告：无法解析文件名 {filename}: {e}")
-                continue
+                    all_dates.add((y, m, d))
     
     # 输出统计结果
     if year is not None and month is not None:
@@ -86,17 +120,12 @@ def get_photo_statistics(folder_path, year=None, month=None, auto_detect=True):
         print("-" * 50)
         
         # 获取该月的天数
-        first_day = datetime(year, month, 1)
-        if month == 12:
-            next_month = datetime(year + 1, 1, 1)
-        else:
-            next_month = datetime(year, month + 1, 1)
-        days_in_month = (next_month - first_day).days
+        month_days = days_in_month(year, month)
         
         total_photos = 0
         photo_days = 0
         
-        for day in range(1, days_in_month + 1):
+        for day in range(1, month_days + 1):
             count = day_count.get(day, 0)
             if count == 0:
                 print(f"{day:02d}日：未拍照")
@@ -109,8 +138,8 @@ def get_photo_statistics(folder_path, year=None, month=None, auto_detect=True):
         print(f"统计汇总：")
         print(f"   总照片数：{total_photos} 张")
         print(f"   拍照天数：{photo_days} 天")
-        print(f"   未拍天数：{days_in_month - photo_days} 天")
-        print(f"   拍照率：{photo_days/days_in_month*100:.1f}%")
+        print(f"   未拍天数：{month_days - photo_days} 天")
+        print(f"   拍照率：{photo_days/month_days*100:.1f}%")
         
     else:
         # 统计所有日期
@@ -121,13 +150,13 @@ def get_photo_statistics(folder_path, year=None, month=None, auto_detect=True):
         sorted_dates = sorted(all_dates)
         total_photos = sum(day_count.values())
         
-        for date_obj in sorted_dates:
+        for y, m, d in sorted_dates:
             if year is not None:
-                key = f"{date_obj.month:02d}-{date_obj.day:02d}"
-                date_str = f"{date_obj.month:02d}月{date_obj.day:02d}日"
+                key = f"{m:02d}-{d:02d}"
+                date_str = f"{m:02d}月{d:02d}日"
             else:
-                key = f"{date_obj.year}-{date_obj.month:02d}-{date_obj.day:02d}"
-                date_str = f"{date_obj.year}年{date_obj.month:02d}月{date_obj.day:02d}日"
+                key = f"{y}-{m:02d}-{d:02d}"
+                date_str = f"{y}年{m:02d}月{d:02d}日"
             
             count = day_count[key]
             print(f"{date_str}：{count} 张照片")
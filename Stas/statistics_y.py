@@ -1,104 +1,17 @@
-import os
-import re
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import datetime
 import calendar
 
-def scan_all_photos_in_directory(base_directory):
-    """
-    扫描基础目录下所有子文件夹中的照片
-    返回按日期分组的照片统计
-    """
-    photo_stats = defaultdict(int)  # key: 'YYYY-MM-DD', value: count
-    
-    if not os.path.exists(base_directory):
-        print(f"错误：目录 {base_directory} 不存在")
-        return photo_stats
-    
-    print(f"正在扫描目录：{base_directory}")
-    folder_count = 0
-    total_photos = 0
-    
-    # 遍历所有子文件夹
-    for item in os.listdir(base_directory):
-        item_path = os.path.join(base_directory, item)
-        
-        # 只处理文件夹
-        if os.path.isdir(item_path):
-            folder_count += 1
-            folder_photos = 0
-            
-            # 扫描文件夹中的照片
-            try:
-                for filename in os.listdir(item_path):
-                    if filename.startswith("IMG_") and filename.endswith(".jpg"):
-                        try:
-                            # 从文件名提取日期：IMG_20230901_114129.jpg
-                            date_str = filename[4:12]  # 20230901
-                            date_obj = datetime.strptime(date_str, "%Y%m%d")
-                            date_key = date_obj.strftime("%Y-%m-%d")
-                            
-                            photo_stats[date_key] += 1
-                            folder_photos += 1
-                            total_photos += 1
-                            
-                        except ValueError:
-                            # 如果日期解析失败，跳过这个文件
-                            continue
-                            
-            except PermissionError:
-                print(f"警告：无法访问文件夹 {item_path}")
-                continue
-            
-            if folder_photos > 0:
-                print(f"  📁 {item}: {folder_photos} 张照片")
-    
-    print(f"\n扫描完成：")
-    print(f"  📁 总文件夹数：{folder_count}")
-    print(f"  📸 总照片数：{total_photos}")
-    print(f"  📅 拍照天数：{len(photo_stats)}")
-    
-    return photo_stats
-
-def generate_date_range(start_date, end_date):
-    """
-    生成指定日期范围内的所有日期
-    """
-    dates = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        dates.append(current_date)
-        current_date += timedelta(days=1)
-    
-    return dates
-
-def validate_date_handling():
-    """
-    验证日期处理的正确性，特别是月份天数和闰年
-    """
-    print("\n🔍 验证日期处理...")
-    
-    test_cases = [
-        (2023, 2),  # 2023年2月 - 平年，28天
-        (2024, 2),  # 2024年2月 - 闰年，29天
-        (2025, 2),  # 2025年2月 - 平年，28天
-        (2023, 4),  # 2023年4月 - 30天
-        (2023, 12), # 2023年12月 - 31天
-    ]
-    
-    for year, month in test_cases:
-        days_in_month = calendar.monthrange(year, month)[1]
-        is_leap = calendar.isleap(year)
-        
-        print(f"  {year}年{month:02d}月：{days_in_month}天", end="")
-        if month == 2:
-            print(f" ({'闰年' if is_leap else '平年'})", end="")
-        print()
-    
-    print("✅ 日期处理验证完成")
+from npu_stats_core import (
+    scan_all_photos_cached,
+    generate_date_range,
+    generate_date_keys,
+    generate_photo_counts,
+    aggregate_by_period,
+    validate_date_handling,
+    days_in_month,
+)
 
-def print_monthly_statistics(photo_stats, start_date, end_date):
+def print_monthly_statistics(dates, photo_counts):
     """
     按月度打印统计信息，确保正确处理每月天数
     """
@@ -106,30 +19,16 @@ def print_monthly_statistics(photo_stats, start_date, end_date):
     print("📊 月度统计报告")
     print("=" * 80)
     
-    # 按年月分组统计
-    monthly_stats = defaultdict(lambda: {'total_photos': 0, 'photo_days': 0, 'total_days': 0})
-    
-    current_date = start_date
-    while current_date <= end_date:
-        year_month = f"{current_date.year}-{current_date.month:02d}"
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        monthly_stats[year_month]['total_days'] += 1
-        
-        if date_key in photo_stats:
-            monthly_stats[year_month]['total_photos'] += photo_stats[date_key]
-            monthly_stats[year_month]['photo_days'] += 1
-        
-        current_date += timedelta(days=1)
+    # 按年月分组统计（月编号 = 年*12 + 月-1）
+    monthly_stats = aggregate_by_period(dates, photo_counts, lambda d: d.year * 12 + d.month - 1)
     
     # 打印月度统计
-    for year_month in sorted(monthly_stats.keys()):
-        year, month = year_month.split('-')
-        year, month = int(year), int(month)
-        stats = monthly_stats[year_month]
+    for month_id, stats in monthly_stats:
+        year, month = divmod(month_id, 12)
+        month += 1
         
         # 验证天数是否正确
-        expected_days = calendar.monthrange(year, month)[1]
+        expected_days = days_in_month(year, month)
         actual_days = stats['total_days']
         
         photo_rate = (stats['photo_days'] / stats['total_days']) * 100 if stats['total_days'] > 0 else 0
@@ -144,7 +43,7 @@ def print_monthly_statistics(photo_stats, start_date, end_date):
         print(f"   总照片数：{stats['total_photos']} 张")
         print(f"   拍照率：{photo_rate:.1f}%")
 
-def print_yearly_statistics(photo_stats, start_date, end_date):
+def print_yearly_statistics(dates, photo_counts):
     """
     按年度打印统计信息
     """
@@ -153,24 +52,10 @@ def print_yearly_statistics(photo_stats, start_date, end_date):
     print("=" * 80)
     
     # 按年份分组统计
-    yearly_stats = defaultdict(lambda: {'total_photos': 0, 'photo_days': 0, 'total_days': 0})
-    
-    current_date = start_date
-    while current_date <= end_date:
-        year = current_date.year
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        yearly_stats[year]['total_days'] += 1
-        
-        if date_key in photo_stats:
-            yearly_stats[year]['total_photos'] += photo_stats[date_key]
-            yearly_stats[year]['photo_days'] += 1
-        
-        current_date += timedelta(days=1)
+    yearly_stats = aggregate_by_period(dates, photo_counts, lambda d: d.year)
     
     # 打印年度统计
-    for year in sorted(yearly_stats.keys()):
-        stats = yearly_stats[year]
+    for year, stats in yearly_stats:
         photo_rate = (stats['photo_days'] / stats['total_days']) * 100 if stats['total_days'] > 0 else 0
         
         # 验证年度天数
@@ -184,7 +69,7 @@ def print_yearly_statistics(photo_stats, start_date, end_date):
         print(f"   总照片数：{stats['total_photos']} 张")
         print(f"   拍照率：{photo_rate:.1f}%")
 
-def print_detailed_statistics(photo_stats, start_date, end_date):
+def print_detailed_statistics(dates, photo_counts):
     """
     打印详细的每日统计信息
     """
@@ -192,12 +77,10 @@ def print_detailed_statistics(photo_stats, start_date, end_date):
     print("📸 详细每日拍照统计 (2023.09.01 - 2026.04.01)")
     print("=" * 80)
     
-    current_date = start_date
     current_year_month = None
     
-    while current_date <= end_date:
-        year_month = current_date.strftime("%Y年%m月")
-        date_key = current_date.strftime("%Y-%m-%d")
+    for current_date, count in zip(dates, photo_counts.tolist()):
+        year_month = f"{current_date.year}年{current_date.month:02d}月"
         
         # 如果是新的月份，打印月份标题
         if year_month != current_year_month:
@@ -209,13 +92,10 @@ def print_detailed_statistics(photo_stats, start_date, end_date):
         
         # 打印每日情况
         day = current_date.day
-        if date_key in photo_stats:
-            count = photo_stats[date_key]
+        if count > 0:
             print(f"{day:02d}日：✅ {count} 张照片")
         else:
             print(f"{day:02d}日：❌ 未拍照")
-        
-        current_date += timedelta(days=1)
 
 def main():
     """
@@ -247,7 +127,7 @@ def main():
     
     # 扫描所有照片
     print("\n🔍 开始扫描照片...")
-    photo_stats = scan_all_photos_in_directory(base_directory)
+    photo_stats = scan_all_photos_cached(base_directory)
     
     if not photo_stats:
         print("❌ 没有找到任何照片文件")
@@ -265,14 +145,18 @@ def main():
     
     choice = input("\n请输入选择 (1-4): ").strip()
     
+    # 日期序列与每日照片数只构建一次，各统计函数共用
+    dates = generate_date_range(start_date, end_date)
+    photo_counts = generate_photo_counts(photo_stats, generate_date_keys(dates))
+    
     if choice in ['1', '4']:
-        print_yearly_statistics(photo_stats, start_date, end_date)
+        print_yearly_statistics(dates, photo_counts)
     
     if choice in ['2', '4']:
-        print_monthly_statistics(photo_stats, start_date, end_date)
+        print_monthly_statistics(dates, photo_counts)
     
     if choice in ['3', '4']:
-        print_detailed_statistics(photo_stats, start_date, end_date)
+        print_detailed_statistics(dates, photo_counts)
     
     # 总体统计
     total_days = (end_date - start_date).days + 1
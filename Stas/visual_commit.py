@@ -1,64 +1,8 @@
-import os
 import re
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import calendar
 
-def scan_all_photos_in_directory(base_directory):
-    """
-    扫描基础目录下所有子文件夹中的照片
-    返回按日期分组的照片统计
-    """
-    photo_stats = defaultdict(int)  # key: 'YYYY-MM-DD', value: count
-    
-    if not os.path.exists(base_directory):
-        print(f"错误：目录 {base_directory} 不存在")
-        return photo_stats
-    
-    print(f"正在扫描目录：{base_directory}")
-    folder_count = 0
-    total_photos = 0
-    
-    # 遍历所有子文件夹
-    for item in os.listdir(base_directory):
-        item_path = os.path.join(base_directory, item)
-        
-        # 只处理文件夹
-        if os.path.isdir(item_path):
-            folder_count += 1
-            folder_photos = 0
-            
-            # 扫描文件夹中的照片
-            try:
-                for filename in os.listdir(item_path):
-                    if filename.startswith("IMG_") and filename.endswith(".jpg"):
-                        try:
-                            # 从文件名提取日期：IMG_20230901_114129.jpg
-                            date_str = filename[4:12]  # 20230901
-                            date_obj = datetime.strptime(date_str, "%Y%m%d")
-                            date_key = date_obj.strftime("%Y-%m-%d")
-                            
-                            photo_stats[date_key] += 1
-                            folder_photos += 1
-                            total_photos += 1
-                            
-                        except ValueError:
-                            # 如果日期解析失败，跳过这个文件
-                            continue
-                            
-            except PermissionError:
-                print(f"警告：无法访问文件夹 {item_path}")
-                continue
-            
-            if folder_photos > 0:
-                print(f"  📁 {item}: {folder_photos} 张照片")
-    
-    print(f"\n扫描完成：")
-    print(f"  📁 总文件夹数：{folder_count}")
-    print(f"  📸 总照片数：{total_photos}")
-    print(f"  📅 拍照天数：{len(photo_stats)}")
-    
-    return photo_stats
+from npu_stats_core import scan_all_photos_in_directory, days_in_month
 
 def generate_date_range(start_date, end_date):
     """
@@ -73,6 +17,26 @@ def generate_date_range(start_date, end_date):
     
     return dates
 
+def build_photo_ordinals(photo_stats):
+    """
+    将 photo_stats 的 'YYYY-MM-DD' 键一次性转换为日序号（date.toordinal），
+    逐日循环中直接用整数查找，无需每天格式化日期字符串
+    """
+    return {date.fromisoformat(k).toordinal(): v for k, v in photo_stats.items()}
+
+def iter_months(start_date, end_date):
+    """
+    按月遍历日期范围，产出 (年, 月, 该月首日日序号, 范围内首日日序号, 范围内末日日序号)
+    """
+    start_ord, end_ord = start_date.toordinal(), end_date.toordinal()
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        month_ord = date(year, month, 1).toordinal()
+        lo = max(start_ord, month_ord)
+        hi = min(end_ord, month_ord + days_in_month(year, month) - 1)
+        yield year, month, month_ord, lo, hi
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
 def validate_date_handling():
     """
     验证日期处理的正确性，特别是月份天数和闰年
@@ -88,10 +52,10 @@ def validate_date_handling():
     ]
     
     for year, month in test_cases:
-        days_in_month = calendar.monthrange(year, month)[1]
+        month_days = days_in_month(year, month)
         is_leap = calendar.isleap(year)
         
-        print(f"  {year}年{month:02d}月：{days_in_month}天", end="")
+        print(f"  {year}年{month:02d}月：{month_days}天", end="")
         if month == 2:
             print(f" ({'闰年' if is_leap else '平年'})", end="")
         print()
@@ -106,43 +70,46 @@ def print_monthly_statistics(photo_stats, start_date, end_date):
     print("📊 月度统计报告")
     print("=" * 80)
     
-    # 按年月分组统计
-    monthly_stats = defaultdict(lambda: {'total_photos': 0, 'photo_days': 0, 'total_days': 0})
-    
-    current_date = start_date
-    while current_date <= end_date:
-        year_month = f"{current_date.year}-{current_date.month:02d}"
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        monthly_stats[year_month]['total_days'] += 1
-        
-        if date_key in photo_stats:
-            monthly_stats[year_month]['total_photos'] += photo_stats[date_key]
-            monthly_stats[year_month]['photo_days'] += 1
-        
-        current_date += timedelta(days=1)
-    
-    # 打印月度统计
+    # 按年月分组统计：总天数由月历直接给出（首末月按起止日期截断），
+    # 照片只需遍历 photo_stats 中实际存在的拍照日
+    monthly_stats = {
+        f"{year}-{month:02d}": {'total_photos': 0, 'photo_days': 0, 'total_days': hi - lo + 1}
+        for year, month, month_ord, lo, hi in iter_months(start_date, end_date)
+    }
+    
+    start_key = f"{start_date.year:04d}-{start_date.month:02d}-{start_date.day:02d}"
+    end_key = f"{end_date.year:04d}-{end_date.month:02d}-{end_date.day:02d}"
+    for date_key, count in photo_stats.items():
+        if start_key <= date_key <= end_key:
+            stats = monthly_stats[date_key[:7]]
+            stats['total_photos'] += count
+            stats['photo_days'] += 1
+    
+    # 打印月度统计（先拼好所有行，最后一次性输出）
+    lines = []
     for year_month in sorted(monthly_stats.keys()):
         year, month = year_month.split('-')
         year, month = int(year), int(month)
         stats = monthly_stats[year_month]
         
         # 验证天数是否正确
-        expected_days = calendar.monthrange(year, month)[1]
+        expected_days = days_in_month(year, month)
         actual_days = stats['total_days']
         
         photo_rate = (stats['photo_days'] / stats['total_days']) * 100 if stats['total_days'] > 0 else 0
         
-        print(f"\n📅 {year}年{month:02d}月：")
-        print(f"   总天数：{stats['total_days']} 天", end="")
+        lines.append(f"\n📅 {year}年{month:02d}月：")
+        days_line = f"   总天数：{stats['total_days']} 天"
         if actual_days != expected_days:
-            print(f" ⚠️ (期望{expected_days}天)", end="")
-        print()
-        print(f"   拍照天数：{stats['photo_days']} 天")
-        print(f"   未拍天数：{stats['total_days'] - stats['photo_days']} 天")
-        print(f"   总照片数：{stats['total_photos']} 张")
-        print(f"   拍照率：{photo_rate:.1f}%")
+            days_line += f" ⚠️ (期望{expected_days}天)"
+        lines.append(days_line)
+        lines.append(f"   拍照天数：{stats['photo_days']} 天")
+        lines.append(f"   未拍天数：{stats['total_days'] - stats['photo_days']} 天")
+        lines.append(f"   总照片数：{stats['total_photos']} 张")
+        lines.append(f"   拍照率：{photo_rate:.1f}%")
+    
+    if lines:
+        print("\n".join(lines))
 
 def print_yearly_statistics(photo_stats, start_date, end_date):
     """
@@ -152,21 +119,22 @@ def print_yearly_statistics(photo_stats, start_date, end_date):
     print("📊 年度统计报告")
     print("=" * 80)
     
-    # 按年份分组统计
-    yearly_stats = defaultdict(lambda: {'total_photos': 0, 'photo_days': 0, 'total_days': 0})
-    
-    current_date = start_date
-    while current_date <= end_date:
-        year = current_date.year
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        yearly_stats[year]['total_days'] += 1
-        
-        if date_key in photo_stats:
-            yearly_stats[year]['total_photos'] += photo_stats[date_key]
-            yearly_stats[year]['photo_days'] += 1
-        
-        current_date += timedelta(days=1)
+    # 按年份分组统计：总天数为该年落在统计范围内的天数，照片只遍历拍照日
+    yearly_stats = {}
+    for year in range(start_date.year, end_date.year + 1):
+        first = start_date if year == start_date.year else datetime(year, 1, 1)
+        last = end_date if year == end_date.year else datetime(year, 12, 31)
+        yearly_stats[year] = {
+            'total_photos': 0, 'photo_days': 0, 'total_days': (last - first).days + 1
+        }
+    
+    start_key = f"{start_date.year:04d}-{start_date.month:02d}-{start_date.day:02d}"
+    end_key = f"{end_date.year:04d}-{end_date.month:02d}-{end_date.day:02d}"
+    for date_key, count in photo_stats.items():
+        if start_key <= date_key <= end_key:
+            stats = yearly_stats[int(date_key[:4])]
+            stats['total_photos'] += count
+            stats['photo_days'] += 1
     
     # 打印年度统计
     for year in sorted(yearly_stats.keys()):
@@ -207,40 +175,51 @@ def print_github_style_commit_chart(photo_stats, start_date, end_date):
     print("\n     周一 周二 周三 周四 周五 周六 周日")
     print("   " + "─" * 32)
     
-    current_date = actual_start
+    photo_ordinals = build_photo_ordinals(photo_stats)
+    first_ord = actual_start.toordinal()
+    start_ord = start_date.toordinal()
     week_count = 0
+    wd = 0  # actual_start 一定是周一；用整数计数代替逐日调用 weekday()
+    lines = []  # 每周一行，拼好后一次性输出
+    row = ""
     
-    while current_date <= end_date:
+    # 行首的年月标签按月份预先生成，周一时按 (年, 月) 查表
+    month_labels = {(year, month): f"{year % 100:02d}.{month:02d}"
+                    for year, month, *_ in iter_months(actual_start, end_date)}
+    
+    for o in range(first_ord, end_date.toordinal() + 1):
         # 每周开始时打印年月信息
-        if current_date.weekday() == 0:  # 周一
+        if wd == 0:  # 周一
             week_count += 1
-            year_month = current_date.strftime("%y.%m")
-            print(f"{year_month} │", end="")
+            week_start = date.fromordinal(o)
+            year_month = month_labels[week_start.year, week_start.month]
+            row = f"{year_month} │"
         
         # 判断当前日期的状态
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        if current_date < start_date or current_date > end_date:
-            # 统计范围外
+        if o < start_ord:
+            # 统计范围外（循环条件已保证不晚于 end_date）
             symbol = "⬜"
-        elif date_key in photo_stats:
+        elif o in photo_ordinals:
             # 有拍照
             symbol = "✅"
         else:
             # 未拍照
             symbol = "❌"
         
-        print(f" {symbol} ", end="")
+        row += f" {symbol} "
         
         # 如果是周日，换行
-        if current_date.weekday() == 6:
-            print()
+        if wd == 6:
+            lines.append(row)
         
-        current_date += timedelta(days=1)
+        wd = (wd + 1) % 7
     
     # 如果最后一行不完整，补齐并换行
-    if current_date.weekday() != 0:
-        print()
+    if wd != 0:
+        lines.append(row)
+    
+    if lines:
+        print("\n".join(lines))
     
     print("\n" + "─" * 100)
 
@@ -252,34 +231,12 @@ def print_compact_commit_chart(photo_stats, start_date, end_date):
     print("📅 按月拍照情况图表")
     print("=" * 80)
     
-    current_date = start_date
-    current_year_month = None
-    week_data = []
-    
-    while current_date <= end_date:
-        year_month = current_date.strftime("%Y年%m月")
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        # 如果是新的月份
-        if year_month != current_year_month:
-            # 打印之前月份的数据
-            if current_year_month is not None and week_data:
-                print_month_chart(current_year_month, week_data)
-                week_data = []
-            
-            current_year_month = year_month
-        
-        # 添加当天数据
-        if date_key in photo_stats:
-            week_data.append("✅")
-        else:
-            week_data.append("❌")
-        
-        current_date += timedelta(days=1)
+    photo_ordinals = build_photo_ordinals(photo_stats)
     
-    # 打印最后一个月的数据
-    if current_year_month is not None and week_data:
-        print_month_chart(current_year_month, week_data)
+    # 逐月生成当月每天的状态并打印
+    for year, month, month_ord, lo, hi in iter_months(start_date, end_date):
+        week_data = ["✅" if o in photo_ordinals else "❌" for o in range(lo, hi + 1)]
+        print_month_chart(f"{year:04d}年{month:02d}月", week_data)
 
 def print_month_chart(year_month, week_data):
     """
@@ -301,30 +258,27 @@ def print_detailed_statistics(photo_stats, start_date, end_date):
     print("📸 详细每日拍照统计 (2023.09.01 - 2026.04.30)")
     print("=" * 80)
     
-    current_date = start_date
-    current_year_month = None
+    photo_ordinals = build_photo_ordinals(photo_stats)
+    lines = []  # 逐日输出近千行，先拼好再一次性打印
     
-    while current_date <= end_date:
-        year_month = current_date.strftime("%Y年%m月")
-        date_key = current_date.strftime("%Y-%m-%d")
-        
-        # 如果是新的月份，打印月份标题
-        if year_month != current_year_month:
-            if current_year_month is not None:
-                print()  # 月份之间空一行
-            print(f"\n🗓️  {year_month}")
-            print("-" * 50)
-            current_year_month = year_month
+    for i, (year, month, month_ord, lo, hi) in enumerate(iter_months(start_date, end_date)):
+        # 每个月份打印月份标题，月份之间空一行
+        if i > 0:
+            lines.append("")
+        lines.append(f"\n🗓️  {year:04d}年{month:02d}月")
+        lines.append("-" * 50)
         
         # 打印每日情况
-        day = current_date.day
-        if date_key in photo_stats:
-            count = photo_stats[date_key]
-            print(f"{day:02d}日：✅ {count} 张照片")
-        else:
-            print(f"{day:02d}日：❌ 未拍照")
-        
-        current_date += timedelta(days=1)
+        for o in range(lo, hi + 1):
+            day = o - month_ord + 1
+            count = photo_ordinals.get(o)
+            if count is not None:
+                lines.append(f"{day:02d}日：✅ {count} 张照片")
+            else:
+                lines.append(f"{day:02d}日：❌ 未拍照")
+    
+    if lines:
+        print("\n".join(lines))
 
 def main():
     """
@@ -1,78 +1,25 @@
 import os
 import re
-from collections import defaultdict
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import calendar
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.colors import ListedColormap
 import numpy as np
 
+from npu_stats_core import scan_all_photos_in_directory, days_in_month
+
 # 配置matplotlib支持中文显示
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
 
-def scan_all_photos_in_directory(base_directory):
-    """
-    扫描基础目录下所有子文件夹中的照片
-    返回按日期分组的照片统计
-    """
-    photo_stats = defaultdict(int)  # key: 'YYYY-MM-DD', value: count
-    
-    if not os.path.exists(base_directory):
-        print(f"错误：目录 {base_directory} 不存在")
-        return photo_stats
-    
-    print(f"正在扫描目录：{base_directory}")
-    folder_count = 0
-    total_photos = 0
-    
-    # 遍历所有子文件夹
-    for item in os.listdir(base_directory):
-        item_path = os.path.join(base_directory, item)
-        
-        # 只处理文件夹
-        if os.path.isdir(item_path):
-            folder_count += 1
-            folder_photos = 0
-            
-            # 扫描文件夹中的照片
-            try:
-                for filename in os.listdir(item_path):
-                    if filename.startswith("IMG_") and filename.endswith(".jpg"):
-                        try:
-                            # 从文件名提取日期：IMG_20230901_114129.jpg
-                            date_str = filename[4:12]  # 20230901
-                            date_obj = datetime.strptime(date_str, "%Y%m%d")
-                            date_key = date_obj.strftime("%Y-%m-%d")
-                            
-                            photo_stats[date_key] += 1
-                            folder_photos += 1
-                            total_photos += 1
-                            
-                        except ValueError:
-                            # 如果日期解析失败，跳过这个文件
-                            continue
-                            
-            except PermissionError:
-                print(f"警告：无法访问文件夹 {item_path}")
-                
-            if folder_photos > 0:
-                print(f"  {item}: {folder_photos} 张照片")
-    
-    print(f"\n扫描完成：")
-    print(f"  文件夹数量：{folder_count}")
-    print(f"  总照片数：{total_photos}")
-    print(f"  拍照天数：{len(photo_stats)}")
-    
-    return photo_stats
-
 def is_leap_year(year):
     """判断是否为闰年"""
     return calendar.isleap(year)
 
 def get_days_in_month(year, month):
     """获取指定年月的天数"""
-    return calendar.monthrange(year, month)[1]
+    return days_in_month(year, month)
 
 def validate_date_range(start_date_str, end_date_str):
     """验证日期范围的有效性"""
@@ -90,17 +37,6 @@ def validate_date_range(start_date_str, end_date_str):
         print(f"日期格式错误：{e}")
         return False, None, None
 
-def generate_date_range(start_date, end_date):
-    """生成日期范围内的所有日期"""
-    current_date = start_date
-    dates = []
-    
-    while current_date <= end_date:
-        dates.append(current_date.strftime("%Y-%m-%d"))
-        current_date += timedelta(days=1)
-    
-    return dates
-
 def generate_github_style_commit_png(photo_stats, start_date_str="2023-09-01", end_date_str="2026-04-30"):
     """
     生成GitHub风格的提交图PNG
@@ -110,43 +46,32 @@ def generate_github_style_commit_png(photo_stats, start_date_str="2023-09-01", e
     if not is_valid:
         return
     
-    # 生成完整的日期范围
-    all_dates = generate_date_range(start_date, end_date)
-    
     # 找到开始日期是星期几 (0=周一, 6=周日)
     start_weekday = start_date.weekday()
     
     # 调整开始日期到周一
     adjusted_start = start_date - timedelta(days=start_weekday)
     
-    # 生成周数据矩阵
-    weeks_data = []
-    current_week = [0] * 7  # 周一到周日
-    current_date = adjusted_start
+    # 生成周数据矩阵：以 adjusted_start 为第 0 天的日序号数组，到 end_date 所在周为止补齐整周后 reshape 成 (周数, 7)
+    # 超出范围的格子与未拍照同色，统一为 0
+    first_ord = adjusted_start.toordinal()
+    start_idx = start_date.toordinal() - first_ord
+    end_idx = end_date.toordinal() - first_ord
     
-    while current_date <= end_date + timedelta(days=6):  # 确保包含最后一周
-        weekday = current_date.weekday()  # 0=周一, 6=周日
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        # 判断这一天的状态
-        if current_date < start_date or current_date > end_date:
-            current_week[weekday] = -1  # 超出范围
-        elif date_str in photo_stats:
-            current_week[weekday] = min(photo_stats[date_str], 4)  # 限制最大值为4
-        else:
-            current_week[weekday] = 0  # 没有拍照
-        
-        # 如果是周日或者是最后一天，完成这一周
-        if weekday == 6 or current_date == end_date + timedelta(days=6):
-            weeks_data.append(current_week[:])
-            current_week = [0] * 7
-        
-        current_date += timedelta(days=1)
+    day_values = np.zeros((end_idx // 7 + 1) * 7, dtype=np.uint8)
+    
+    # photo_stats 的键一次性转换为日序号，范围内的日子按数量着色（整体截断到 0..4）
+    photo_idx = np.fromiter((date.fromisoformat(k).toordinal() for k in photo_stats),
+                            dtype=np.int64, count=len(photo_stats)) - first_ord
+    photo_num = np.fromiter(photo_stats.values(), dtype=np.int64, count=len(photo_stats))
+    in_range = (photo_idx >= start_idx) & (photo_idx <= end_idx)
+    day_values[photo_idx[in_range]] = np.clip(photo_num[in_range], 0, 4)
+    
+    weeks_data = day_values.reshape(-1, 7)  # 每行一周：周一到周日
     
     # 创建颜色映射
     colors = {
-        -1: '#ebedf0',  # 超出范围 - 浅灰色
-        0: '#ebedf0',   # 没有拍照 - 浅灰色
+        0: '#ebedf0',   # 没有拍照或超出范围 - 浅灰色
         1: '#9be9a8',   # 1张照片 - 浅绿色
         2: '#40c463',   # 2张照片 - 中绿色
         3: '#30a14e',   # 3张照片 - 深绿色
@@ -163,22 +88,22 @@ def generate_github_style_commit_png(photo_stats, start_date_str="2023-09-01", e
     
     fig, ax = plt.subplots(figsize=(max(fig_width, 16), fig_height))
     
-    # 绘制网格
-    for week_idx, week_data in enumerate(weeks_data):
-        x_offset = week_idx * (cell_size + cell_gap)
-        for day_idx, value in enumerate(week_data):
-            y_offset = (6 - day_idx) * (cell_size + cell_gap)  # 从上到下：周一到周日
-            
-            # 绘制方块
-            rect = patches.Rectangle(
-                (x_offset, y_offset), 
-                cell_size, 
-                cell_size,
-                linewidth=1,
-                edgecolor='white',
-                facecolor=colors[value]
-            )
-            ax.add_patch(rect)
+    # 绘制网格：一次 pcolormesh 画出全部方块。网格边界交替为“方块/间隙”，
+    # 间隙列/行用掩码留空，方块位置与原先逐个 Rectangle 绘制时一致
+    pitch = cell_size + cell_gap
+    x_edges = np.empty(2 * weeks_count)
+    x_edges[0::2] = np.arange(weeks_count) * pitch
+    x_edges[1::2] = x_edges[0::2] + cell_size
+    y_edges = np.empty(14)
+    y_edges[0::2] = np.arange(7) * pitch
+    y_edges[1::2] = y_edges[0::2] + cell_size
+
+    cell_values = np.ma.masked_all((13, 2 * weeks_count - 1), dtype=np.uint8)
+    cell_values[0::2, 0::2] = weeks_data.T[::-1]  # y 从下往上为周日到周一
+
+    cmap = ListedColormap([colors[v] for v in range(5)])  # 0..4 依次对应五种颜色
+    ax.pcolormesh(x_edges, y_edges, cell_values, cmap=cmap, vmin=0, vmax=4,
+                  edgecolors='white', linewidth=1)
     
     # 添加星期标签
     weekday_labels = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
@@ -190,16 +115,19 @@ def generate_github_style_commit_png(photo_stats, start_date_str="2023-09-01", e
     month_positions = []
     current_month = None
     
-    for week_idx, week_data in enumerate(weeks_data):
-        # 计算这一周的第一天日期
-        week_start = adjusted_start + timedelta(weeks=week_idx)
-        if week_start.month != current_month and week_start >= start_date:
-            current_month = week_start.month
+    one_week = timedelta(weeks=1)
+    week_start = adjusted_start  # 当前周的第一天（周一），逐周递增
+    
+    for week_idx in range(len(weeks_data)):
+        week_month = week_start.month
+        if week_month != current_month and week_start >= start_date:
+            current_month = week_month
             month_label = f"{week_start.year}年{week_start.month:02d}月"
             x_pos = week_idx * (cell_size + cell_gap)
             ax.text(x_pos, 7 * (cell_size + cell_gap) + 5, month_label, 
                     ha='left', va='bottom', fontsize=9, fontfamily='SimHei', rotation=45)
-    
+        week_start += one_week
+
     # 设置坐标轴
     ax.set_xlim(-50, weeks_count * (cell_size + cell_gap))
     ax.set_ylim(-10, 7 * (cell_size + cell_gap) + 30)
@@ -207,8 +135,8 @@ def generate_github_style_commit_png(photo_stats, start_date_str="2023-09-01", e
     ax.axis('off')
     
     # 添加标题和统计信息
-    total_days = len(all_dates)
-    photo_days = len([d for d in all_dates if d in photo_stats])
+    total_days = end_idx - start_idx + 1
+    photo_days = int(in_range.sum())
     no_photo_days = total_days - photo_days
     total_photos = sum(photo_stats.values())
     photo_rate = (photo_days / total_days) * 100 if total_days > 0 else 0
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 import calendar
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.colors import ListedColormap
 import numpy as np
 import warnings
 
@@ -62,6 +63,7 @@ class NPUPhotoAnalyzer:
         """
         self.base_directory = base_directory
         self.photo_stats = defaultdict(int)  # key: 'YYYY-MM-DD', value: count
+        self._parsed_keys = {}  # key: 'YYYY-MM-DD', value: datetime，扫描后解析一次供各报告复用
         
     def scan_all_photos(self):
         """
@@ -76,45 +78,51 @@ class NPUPhotoAnalyzer:
         folder_count = 0
         total_photos = 0
         
-        # 遍历所有子文件夹
-        for item in os.listdir(self.base_directory):
-            item_path = os.path.join(self.base_directory, item)
-            
-            # 只处理文件夹
-            if os.path.isdir(item_path):
+        # 遍历所有子文件夹（DirEntry 自带路径与类型，无需 os.path.join / isdir）
+        with os.scandir(self.base_directory) as entries:
+            for entry in entries:
+                # 只处理文件夹
+                if not entry.is_dir():
+                    continue
+                item_path = entry.path
                 folder_count += 1
                 folder_photos = 0
                 
-                # 扫描文件夹中的照片
+                # 扫描文件夹中的照片（只解析文件名，不需要拼接完整路径）
                 try:
-                    for filename in os.listdir(item_path):
-                        if filename.startswith("IMG_") and filename.endswith(".jpg"):
-                            try:
-                                # 从文件名提取日期：IMG_20230901_114129.jpg
+                    with os.scandir(item_path) as files:
+                        for f in files:
+                            filename = f.name
+                            if filename[:4] == "IMG_" and filename[-4:] == ".jpg":
+                                # 从文件名提取日期：IMG_20230901_114129.jpg -> 2023-09-01（直接切片，不经 strptime/strftime）
                                 date_str = filename[4:12]  # 20230901
-                                date_obj = datetime.strptime(date_str, "%Y%m%d")
-                                date_key = date_obj.strftime("%Y-%m-%d")
+                                if len(date_str) != 8 or not (date_str.isascii() and date_str.isdigit()):
+                                    # 如果日期解析失败，跳过这个文件
+                                    continue
+                                year, month, day = int(date_str[:4]), int(date_str[4:6]), int(date_str[6:])
+                                if not (1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]):
+                                    continue
+                                date_key = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
                                 
                                 self.photo_stats[date_key] += 1
                                 folder_photos += 1
                                 total_photos += 1
-                                
-                            except ValueError:
-                                # 如果日期解析失败，跳过这个文件
-                                continue
-                                
+                                    
                 except PermissionError:
                     print(f"警告：无法访问文件夹 {item_path}")
                     continue
                 
                 if folder_photos > 0:
-                    print(f"  📁 {item}: {folder_photos} 张照片")
+                    print(f"  📁 {entry.name}: {folder_photos} 张照片")
         
         print(f"\n扫描完成：")
         print(f"  📁 总文件夹数：{folder_count}")
         print(f"  📸 总照片数：{total_photos}")
         print(f"  📅 拍照天数：{len(self.photo_stats)}")
         
+        # 日期键只解析一次，后续按日期范围筛选时直接查表
+        self._parsed_keys = {k: datetime(int(k[:4]), int(k[5:7]), int(k[8:10])) for k in self.photo_stats}
+        
         return len(self.photo_stats) > 0
     
     def validate_date_handling(self):
@@ -248,21 +256,34 @@ class NPUPhotoAnalyzer:
         markdown_content.append("## 📊 年度统计报告")
         markdown_content.append("")
         
-        # 按年份分组统计
-        yearly_stats = defaultdict(lambda: {'total_photos': 0, 'photo_days': 0, 'total_days': 0})
-        
-        current_date = start_date
-        while current_date <= end_date:
-            year = current_date.year
-            date_key = current_date.strftime("%Y-%m-%d")
-            
-            yearly_stats[year]['total_days'] += 1
-            
-            if date_key in self.photo_stats:
-                yearly_stats[year]['total_photos'] += self.photo_stats[date_key]
-                yearly_stats[year]['photo_days'] += 1
-            
-            current_date += timedelta(days=1)
+        # 按年份分组统计：以日序号为下标构建每日数组，再用 np.bincount 按年份汇总
+        start_ord = start_date.toordinal()
+        n_days = end_date.toordinal() - start_ord + 1
+        
+        # 每天所属年份：按年份边界整段填充，无需逐日构造日期
+        day_years = np.empty(n_days, dtype=np.int64)
+        for year in range(start_date.year, end_date.year + 1):
+            lo = max(datetime(year, 1, 1).toordinal() - start_ord, 0)
+            hi = min(datetime(year, 12, 31).toordinal() - start_ord, n_days - 1)
+            day_years[lo:hi + 1] = year - start_date.year
+        
+        # 每天的照片数与是否拍照（只遍历 photo_stats 中实际存在的日期）
+        photo_counts = np.zeros(n_days, dtype=np.int64)
+        has_photo = np.zeros(n_days, dtype=bool)
+        for date_key, count in self.photo_stats.items():
+            idx = self._parsed_keys[date_key].toordinal() - start_ord
+            if 0 <= idx < n_days:
+                photo_counts[idx] = count
+                has_photo[idx] = True
+        
+        total_days = np.bincount(day_years)
+        total_photos = np.bincount(day_years, weights=photo_counts).astype(np.int64)
+        photo_days = np.bincount(day_years, weights=has_photo).astype(np.int64)
+        
+        yearly_stats = {
+            start_date.year + i: {'total_photos': p, 'photo_days': pd, 'total_days': td}
+            for i, (p, pd, td) in enumerate(zip(total_photos.tolist(), photo_days.tolist(), total_days.tolist()))
+        }
         
         # 生成年度统计表格
         markdown_content.append("| 年份 | 总天数 | 拍照天数 | 未拍天数 | 总照片数 | 拍照率 |")
@@ -315,6 +336,8 @@ class NPUPhotoAnalyzer:
                 current_year_month = year_month
                 day_count = 0
                 line = ""
+                # 当月天数只在进入新月份时计算一次
+                days_in_current_month = calendar.monthrange(current_date.year, current_date.month)[1]
             
             day_count += 1
             
@@ -327,7 +350,6 @@ class NPUPhotoAnalyzer:
             line += f"{symbol} "
             
             # 每7天一行或月末
-            days_in_current_month = calendar.monthrange(current_date.year, current_date.month)[1]
             if day_count % 7 == 0 or day_count == days_in_current_month:
                 week_start = max(1, day_count - 6)
                 week_end = day_count
@@ -357,34 +379,27 @@ class NPUPhotoAnalyzer:
         # 调整开始日期到周一
         adjusted_start = start_date - timedelta(days=start_weekday)
         
-        # 生成周数据矩阵
-        weeks_data = []
-        current_week = [0] * 7  # 周一到周日
-        current_date = adjusted_start
+        # 生成周数据矩阵：以 adjusted_start 为第 0 天的日序号数组，补齐到整周后 reshape 成 (周数, 7)
+        # 超出范围的格子与未拍照同色，统一为 0
+        first_ord = adjusted_start.toordinal()
+        n_days = (end_date + timedelta(days=6)).toordinal() - first_ord + 1  # 确保包含最后一周
+        start_idx = start_date.toordinal() - first_ord
+        end_idx = end_date.toordinal() - first_ord
         
-        while current_date <= end_date + timedelta(days=6):  # 确保包含最后一周
-            weekday = current_date.weekday()  # 0=周一, 6=周日
-            date_str = current_date.strftime("%Y-%m-%d")
-            
-            # 判断这一天的状态
-            if current_date < start_date or current_date > end_date:
-                current_week[weekday] = -1  # 超出范围
-            elif date_str in self.photo_stats:
-                current_week[weekday] = min(self.photo_stats[date_str], 4)  # 限制最大值为4
-            else:
-                current_week[weekday] = 0  # 没有拍照
-            
-            # 如果是周日或者是最后一天，完成这一周
-            if weekday == 6 or current_date == end_date + timedelta(days=6):
-                weeks_data.append(current_week[:])
-                current_week = [0] * 7
-            
-            current_date += timedelta(days=1)
+        day_values = np.zeros(-(-n_days // 7) * 7, dtype=np.uint8)
+        
+        # 范围内的拍照日按数量着色（截断到 0..4）
+        photo_idx = np.fromiter((self._parsed_keys[k].toordinal() for k in self.photo_stats),
+                                dtype=np.int64, count=len(self.photo_stats)) - first_ord
+        photo_num = np.fromiter(self.photo_stats.values(), dtype=np.int64, count=len(self.photo_stats))
+        in_range = (photo_idx >= start_idx) & (photo_idx <= end_idx)
+        day_values[photo_idx[in_range]] = np.clip(photo_num[in_range], 0, 4)
+        
+        weeks_data = day_values.reshape(-1, 7)  # 每行一周：周一到周日
         
         # 创建颜色映射
         colors = {
-            -1: '#ebedf0',  # 超出范围 - 浅灰色
-            0: '#ebedf0',   # 没有拍照 - 浅灰色
+            0: '#ebedf0',   # 没有拍照或超出范围 - 浅灰色
             1: '#9be9a8',   # 1张照片 - 浅绿色
             2: '#40c463',   # 2张照片 - 中绿色
             3: '#30a14e',   # 3张照片 - 深绿色
@@ -401,22 +416,22 @@ class NPUPhotoAnalyzer:
         
         fig, ax = plt.subplots(figsize=(max(fig_width, 16), fig_height))
         
-        # 绘制网格
-        for week_idx, week_data in enumerate(weeks_data):
-            x_offset = week_idx * (cell_size + cell_gap)
-            for day_idx, value in enumerate(week_data):
-                y_offset = (6 - day_idx) * (cell_size + cell_gap)  # 从上到下：周一到周日
-                
-                # 绘制方块
-                rect = patches.Rectangle(
-                    (x_offset, y_offset), 
-                    cell_size, 
-                    cell_size,
-                    linewidth=1,
-                    edgecolor='white',
-                    facecolor=colors[value]
-                )
-                ax.add_patch(rect)
+        # 绘制网格：一次 pcolormesh 画出全部方块。网格边界交替为“方块/间隙”，
+        # 间隙列/行用掩码留空，方块位置与逐个 Rectangle 绘制时一致
+        pitch = cell_size + cell_gap
+        x_edges = np.empty(2 * weeks_count)
+        x_edges[0::2] = np.arange(weeks_count) * pitch
+        x_edges[1::2] = x_edges[0::2] + cell_size
+        y_edges = np.empty(14)
+        y_edges[0::2] = np.arange(7) * pitch
+        y_edges[1::2] = y_edges[0::2] + cell_size
+        
+        cell_values = np.ma.masked_all((13, 2 * weeks_count - 1), dtype=np.uint8)
+        cell_values[0::2, 0::2] = weeks_data.T[::-1]  # y 从下往上为周日到周一
+        
+        cmap = ListedColormap([colors[v] for v in range(5)])  # 0..4 依次对应五种颜色
+        ax.pcolormesh(x_edges, y_edges, cell_values, cmap=cmap, vmin=0, vmax=4,
+                      edgecolors='white', linewidth=1)
         
         # 添加星期标签
         weekday_labels = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
@@ -446,10 +461,10 @@ class NPUPhotoAnalyzer:
         # 添加标题和统计信息
         total_days = (end_date - start_date).days + 1
         photo_days = len([d for d in self.photo_stats.keys() 
-                         if start_date <= datetime.strptime(d, "%Y-%m-%d") <= end_date])
+                         if start_date <= self._parsed_keys[d] <= end_date])
         no_photo_days = total_days - photo_days
         total_photos = sum([v for k, v in self.photo_stats.items() 
-                           if start_date <= datetime.strptime(k, "%Y-%m-%d") <= end_date])
+                           if start_date <= self._parsed_keys[k] <= end_date])
         photo_rate = (photo_days / total_days) * 100 if total_days > 0 else 0
         avg_photos = total_photos / photo_days if photo_days > 0 else 0
         
@@ -557,9 +572,9 @@ class NPUPhotoAnalyzer:
         # 显示统计摘要
         total_days = (end_date - start_date).days + 1
         photo_days = len([d for d in self.photo_stats.keys() 
-                         if start_date <= datetime.strptime(d, "%Y-%m-%d") <= end_date])
+                         if start_date <= self._parsed_keys[d] <= end_date])
         total_photos = sum([v for k, v in self.photo_stats.items() 
-                           if start_date <= datetime.strptime(k, "%Y-%m-%d") <= end_date])
+                           if start_date <= self._parsed_keys[k] <= end_date])
         photo_rate = (photo_days / total_days) * 100 if total_days > 0 else 0
         
         print(f"\n📊 统计摘要：")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图像文件收集公共模块
+
+基于os.scandir遍历目录树收集图像文件，供流水线、Resize、Align、Mosaic
+以及JustTry中的文件顺序测试脚本共用
+"""
+
+import os
+
+# 各模块默认处理的图像扩展名（小写，带点）
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
+
+def walk_images(root, exts=IMAGE_EXTENSIONS):
+    """
+    遍历目录树，产出扩展名（不区分大小写）在exts中的文件路径（字符串）
+
+    直接使用DirEntry缓存的类型信息，不像Path.rglob那样对每个条目再次stat；
+    产出顺序与目录读取顺序有关，调用方按需排序
+
+    Args:
+        root: 根目录
+        exts: 扩展名集合（小写，带点）
+    """
+    suffixes = tuple(exts)  # str.endswith接受元组，一次C层扫描完成多个后缀的匹配
+    stack = [os.fspath(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and entry.name.lower().endswith(suffixes):
+                    yield entry.path
@@ -23,9 +23,10 @@ import shutil
 from datetime import datetime
 
 from Resize.image_resizer import process_directory as resize_images
-from Align.main_align import MainAlign
+from image_files import walk_images, IMAGE_EXTENSIONS
+# Align（torch/kornia）与Stas（matplotlib）在对应步骤中再导入：Resize和Mosaic的进程池
+# 以spawn/forkserver启动工作进程时会重新导入本模块，顶层只保留轻量依赖
 from Timelapse.create_timelapse import create_file_list, create_timelapse_video
-from Stas.visual_report_generator import generate_npu_statistics_reports
 from PIL import Image
 
 
@@ -57,19 +58,27 @@ class TickTockPipeline:
     """TickTock 完整处理流水线"""
     
     @staticmethod
-    def get_sorted_image_files(directory, extensions=None):
-        """获取按时间顺序排序的图像文件列表"""
+    def get_sorted_image_files(directory, extensions=None, files=None):
+        """
+        获取按时间顺序排序的图像文件列表
+        
+        Args:
+            directory (Path): 图像目录
+            extensions (set): 图像扩展名集合
+            files (list): 已遍历得到的文件列表，提供时不再遍历目录，只做过滤和排序
+        """
         if extensions is None:
-            extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
+            extensions = IMAGE_EXTENSIONS
         
-        image_files = []
-        for ext in extensions:
-            image_files.extend(list(directory.rglob(f"*{ext}")))
-            image_files.extend(list(directory.rglob(f"*{ext.upper()}")))
+        if files is not None:
+            paths = [f for f in map(os.fspath, files) if os.path.splitext(f)[1].lower() in extensions]
+        else:
+            # 单次os.scandir遍历，后缀不区分大小写；每个文件只出现一次，无需set去重
+            paths = list(walk_images(directory, extensions))
         
-        # 去重并按时间顺序排序（先按文件夹，再按文件名）
-        image_files = sorted(set(image_files), key=lambda x: (str(x.parent), x.name))
-        return image_files
+        # 按时间顺序排序（先按文件夹，再按文件名），循环内只处理str路径，最后再包装为Path
+        paths.sort(key=os.path.split)
+        return [Path(p) for p in paths]
     
     def __init__(self, input_dir, output_dir=None, steps=None, align_method="superpoint"):
         """
@@ -184,6 +193,7 @@ class TickTockPipeline:
             logger.info(f"在源目录中找到 {len(image_files)} 个图像文件")
             
             # 使用MainAlign进行对齐（支持superpoint、enhanced、auto方法）
+            from Align.main_align import MainAlign
             aligner = MainAlign(
                 input_dir=str(source_dir),
                 output_dir=str(self.align_dir),
@@ -425,6 +435,7 @@ class TickTockPipeline:
             # 导入统计生成器
             import sys
             sys.path.append(str(Path(__file__).parent / "Stas"))
+            from Stas.visual_report_generator import generate_npu_statistics_reports
             
             try: 
                 # 生成统计报告